@@ -0,0 +1,47 @@
+"""
+Kivy-free core of the Authenticator app (TOTP generation, corrected clock, NTP,
+vault storage, otpauth parsing). Submodules are imported on first use of one of
+their names, so `import authcore` costs next to nothing.
+"""
+
+import importlib
+
+# Public name -> submodule
+_EXPORTS = {
+    "CorrectedClock": "clock",
+    "ClockSync": "clocksync",
+    "CodeClient": "codeserver",
+    "CodeServer": "codeserver",
+    "check_ntp_offset": "ntp",
+    "query_ntp": "ntp",
+    "parse_otpauth": "otpauth",
+    "get_data_file": "storage",
+    "load_services": "storage",
+    "save_services": "storage",
+    "set_data_dir": "storage",
+    "TOTPEngine": "totp",
+    "decode_secret": "totp",
+    "format_code": "totp",
+    "hotp": "totp",
+    "normalize_secret": "totp",
+    "otp_params": "totp",
+    "JournalStore": "vault",
+    "SaveQueue": "vault",
+    "Vault": "vault",
+    "open_vault": "vault",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'authcore' has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"authcore.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,74 @@
+"""
+Corrected time source shared by code generation and countdowns.
+now() = wall clock anchored to a monotonic clock + measured NTP offset.
+"""
+
+import threading
+import time
+
+# CLOCK_BOOTTIME keeps counting while the device sleeps (Linux/Android);
+# plain CLOCK_MONOTONIC would make every wake-up look like a clock jump.
+# Without it (macOS, Windows) a "jump" may just be the time the device slept.
+COUNTS_SUSPEND = hasattr(time, "CLOCK_BOOTTIME")
+if COUNTS_SUSPEND:
+    def _monotonic():
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+else:
+    _monotonic = time.monotonic
+
+
+class CorrectedClock:
+    """
+    Wall time that advances with a monotonic clock, plus an offset vs. NTP.
+    Small wall-clock adjustments are ignored; when the system clock jumps by
+    more than JUMP_THRESHOLD (user changed the time, OS sync) the clock
+    re-anchors to the new wall time and notifies listeners, since the
+    measured offset was relative to the old one.
+    Thread-safe: now() is also called from background threads.
+    """
+
+    JUMP_THRESHOLD = 2.0
+
+    def __init__(self, offset=0.0):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.offset = offset
+        self._wall0 = time.time()
+        self._mono0 = _monotonic()
+
+    def add_listener(self, callback):
+        """callback(reason, delta) on clock jump ("jump") or new offset ("offset"). May run off the UI thread."""
+        self._listeners.append(callback)
+
+    def _notify(self, reason, delta):
+        for callback in list(self._listeners):
+            try:
+                callback(reason, delta)
+            except Exception as e:
+                print(f"[CorrectedClock] listener error: {e}")
+
+    def now(self):
+        """Corrected UNIX time in seconds."""
+        with self._lock:
+            mono = _monotonic()
+            wall = time.time()
+            projected = self._wall0 + (mono - self._mono0)
+            jump = wall - projected
+            if abs(jump) <= self.JUMP_THRESHOLD:
+                return projected + self.offset
+            self._wall0, self._mono0 = wall, mono
+            corrected = wall + self.offset
+        self._notify("jump", jump)
+        return corrected
+
+    def __call__(self):
+        return self.now()
+
+    def set_offset(self, offset):
+        """Apply an offset measured against time.time() (e.g. from check_ntp_offset)."""
+        with self._lock:
+            delta = offset - self.offset
+            self.offset = offset
+            self._wall0 = time.time()
+            self._mono0 = _monotonic()
+        self._notify("offset", delta)
@@ -0,0 +1,216 @@
+"""
+Persistent NTP offset history with drift estimation.
+The last offsets are kept in clock_offsets.json next to services.json, so a
+cold start applies a predicted offset immediately and only goes to the
+network when the predicted error exceeds RESYNC_THRESHOLD.
+"""
+
+import json
+import os
+import threading
+import time
+
+from authcore.clock import CorrectedClock
+from authcore.ntp import query_ntp
+
+# Offset history file, next to services.json
+OFFSETS_FILE = "clock_offsets.json"
+
+
+class ClockSync:
+    """
+    Offset samples (wall time, offset, delay) with a least-squares drift fit.
+    predict(now) = offset of the last sample + drift * age, where the drift is
+    only extrapolated over MAX_EXTRAPOLATION (and no further than the samples
+    span); past that the offset is held and the error grows at
+    DEFAULT_DRIFT_BOUND again. The error of a fitted drift comes from the
+    sample delays and the fit residuals divided by the span.
+    Methods may be called from background threads.
+    """
+
+    MAX_SAMPLES = 16
+    # Re-sync when the predicted error is above this (seconds)
+    RESYNC_THRESHOLD = 1.0
+    # Drift assumed until it can be fitted (s/s)
+    DEFAULT_DRIFT_BOUND = 100e-6
+    # Lower bound for the uncertainty of a fitted drift (s/s)
+    MIN_DRIFT_UNCERTAINTY = 2e-6
+    # Samples must span this long before the drift is fitted
+    MIN_DRIFT_SPAN = 6 * 3600
+    # A fitted drift is applied for at most this long past the last sample
+    MAX_EXTRAPOLATION = 86400
+    # Real oscillators are well within this; larger fits are noise
+    MAX_DRIFT = 500e-6
+    # Always re-sync after this long, whatever the prediction says
+    MAX_AGE = 7 * 86400
+
+    def __init__(self, clock, path):
+        self.clock = clock
+        self.path = path
+        self._lock = threading.Lock()
+        self._samples = []  # [(time, offset, delay)], oldest first
+        self._syncing = False
+        self.load()
+
+    @classmethod
+    def corrected_clock(cls, data_file):
+        """
+        CorrectedClock with the offset predicted from the history kept next to
+        `data_file` (services.json). No network; for the CLI and code server.
+        """
+        clock = CorrectedClock()
+        cls(clock, os.path.join(os.path.dirname(str(data_file)), OFFSETS_FILE)).apply_prediction()
+        return clock
+
+    # ── persistence ──
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                samples = json.load(f).get("samples", [])
+            self._samples = [tuple(float(v) for v in s[:3]) for s in samples][-self.MAX_SAMPLES:]
+        except (OSError, ValueError, TypeError, AttributeError):
+            self._samples = []
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"samples": self._samples}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[ClockSync] Error saving offsets: {e}")
+
+    # ── samples / prediction ──
+
+    def record(self, offset, delay=0.0, when=None):
+        with self._lock:
+            self._samples.append((time.time() if when is None else when, offset, delay))
+            del self._samples[:-self.MAX_SAMPLES]
+            self._save()
+
+    def on_jump(self, jump):
+        """
+        System clock stepped by `jump` s: stored offsets shift by the same amount.
+        Only valid when the monotonic clock counts suspend (clock.COUNTS_SUSPEND);
+        otherwise a jump may be sleep time and the history must be left alone.
+        """
+        with self._lock:
+            self._samples = [(t + jump, o - jump, d) for t, o, d in self._samples]
+            self._save()
+
+    def _fit(self):
+        """(drift, uncertainty) in s/s, or None when samples don't span MIN_DRIFT_SPAN."""
+        samples = self._samples
+        if len(samples) < 2 or samples[-1][0] - samples[0][0] < self.MIN_DRIFT_SPAN:
+            return None
+        n = len(samples)
+        mt = sum(s[0] for s in samples) / n
+        mo = sum(s[1] for s in samples) / n
+        var = sum((s[0] - mt) ** 2 for s in samples)
+        if var <= 0:
+            return None
+        slope = sum((s[0] - mt) * (s[1] - mo) for s in samples) / var
+        # Offset noise: each sample is within delay/2 of the truth; with more than
+        # two samples the residuals show how noisy they really were
+        noise = max(s[2] for s in samples) / 2
+        if n > 2:
+            residuals = sum((s[1] - mo - slope * (s[0] - mt)) ** 2 for s in samples)
+            noise = max(noise, (residuals / (n - 2)) ** 0.5)
+        # Two standard errors of the slope
+        uncertainty = max(self.MIN_DRIFT_UNCERTAINTY, 2 * noise / var ** 0.5)
+        if uncertainty >= self.DEFAULT_DRIFT_BOUND:
+            return None  # the fit knows less than the default bound
+        return max(-self.MAX_DRIFT, min(self.MAX_DRIFT, slope)), uncertainty
+
+    def drift(self):
+        """Fitted drift in s/s, or None while it cannot be fitted."""
+        fit = self._fit()
+        return None if fit is None else fit[0]
+
+    def _model(self):
+        """(last sample, drift, drift uncertainty, extrapolation limit); caller holds _lock."""
+        last = self._samples[-1]
+        fit = self._fit()
+        if fit is None:
+            return last, 0.0, self.DEFAULT_DRIFT_BOUND, 0.0
+        span = last[0] - self._samples[0][0]
+        return last, fit[0], fit[1], min(self.MAX_EXTRAPOLATION, span)
+
+    def predict(self, now=None):
+        """(offset, error_estimate) for wall time `now`, or None without samples."""
+        with self._lock:
+            if not self._samples:
+                return None
+            if now is None:
+                now = time.time()
+            (t, offset, delay), drift, rate, limit = self._model()
+            age = max(now - t, 0)
+            fitted = min(age, limit)
+            # Past the limit the offset is held and the error grows at the default bound
+            error = delay / 2 + rate * fitted + self.DEFAULT_DRIFT_BOUND * (age - fitted)
+            return offset + drift * fitted, error
+
+    def needs_sync(self, now=None):
+        if now is None:
+            now = time.time()
+        prediction = self.predict(now)
+        if prediction is None:
+            return True
+        return prediction[1] > self.RESYNC_THRESHOLD or now - self._samples[-1][0] > self.MAX_AGE
+
+    def next_check_delay(self, now=None):
+        """Seconds until the predicted error reaches RESYNC_THRESHOLD (0 if already)."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            (t, _, delay), _, rate, limit = self._model()
+        # Age at which delay/2 + rate * min(age, limit) + bound * (age - limit) reaches the threshold
+        budget = self.RESYNC_THRESHOLD - delay / 2
+        if budget <= rate * limit:
+            reach = budget / rate
+        else:
+            reach = limit + (budget - rate * limit) / self.DEFAULT_DRIFT_BOUND
+        age = now - t
+        return max(0.0, min(reach, self.MAX_AGE) - age)
+
+    def apply_prediction(self, now=None):
+        """Set the clock offset from the history. Returns the offset or None."""
+        prediction = self.predict(now)
+        if prediction is None:
+            return None
+        self.clock.set_offset(prediction[0])
+        return prediction[0]
+
+    # ── network ──
+
+    def sync_async(self, callback=None, timeout=5):
+        """
+        Query NTP in a background thread, record the sample and apply it.
+        callback(offset or None) runs on that thread. Overlapping calls are dropped.
+        """
+        with self._lock:
+            if self._syncing:
+                return False
+            self._syncing = True
+
+        def _worker():
+            offset = None
+            try:
+                sample = query_ntp(timeout=timeout)
+                if sample is not None:
+                    self.record(sample.offset, sample.delay, sample.time)
+                    self.clock.set_offset(sample.offset)
+                    offset = sample.offset
+            except Exception as e:
+                print(f"[ClockSync] sync failed: {e}")
+            finally:
+                with self._lock:
+                    self._syncing = False
+            if callback is not None:
+                callback(offset)
+
+        threading.Thread(target=_worker, daemon=True).start()
+        return True
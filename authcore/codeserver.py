@@ -0,0 +1,255 @@
+"""
+Code-serving daemon over a Unix domain socket, for scripts that need many
+codes per minute. The vault is loaded once (read-only), reloaded when its
+files change, and each service's answer is cached until its window ends.
+
+Protocol: one JSON object per line, one answer line per request, in order.
+
+    {"get": ["<id or title>", ...]}  ->  {"codes": [["123456", 1700000030], null, ...]}
+    {"find": "github"}               ->  {"services": [{"id", "title", "account", "code", "expires"}, ...]}
+    {"ping": 1}                      ->  {"ok": true, "services": 1234}
+
+"get" looks keys up by service id, then by title (case-insensitive); unknown
+keys and invalid secrets give null ("find" lists the latter with a null code
+and expires). "expires" is the end of the window in
+corrected Unix time. Errors are answered with {"error": "..."}.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import stat
+
+from authcore.clocksync import ClockSync
+from authcore.totp import TOTPEngine
+from authcore.vault import JournalStore, open_vault
+
+# Large batches are one line; asyncio's default limit is 64 KiB
+MAX_LINE = 4 * 1024 * 1024
+
+
+class CodeServer:
+    """asyncio Unix socket server; all state is touched from the event loop only."""
+
+    # Seconds between checks of the vault files' mtime/size
+    WATCH_INTERVAL = 1.0
+
+    def __init__(self, data_file, socket_path, backend=None, clock=None):
+        self.data_file = str(data_file)
+        self.socket_path = str(socket_path)
+        self.backend = backend
+        if clock is None:
+            # Same corrected time as the app (cached NTP offset, no network)
+            clock = ClockSync.corrected_clock(self.data_file)
+        self.clock = clock
+        self.engine = TOTPEngine(clock=clock)
+        self.requests = 0
+        self._services = {}  # id -> record
+        self._by_title = {}  # lower-case title -> id of its first service
+        self._answers = {}  # id -> (expires, code, serialized [code, expires])
+        self._stamp = None
+
+    # ── vault ──
+
+    def _vault_files(self):
+        journal = JournalStore(self.data_file)
+        db_path = os.path.join(os.path.dirname(self.data_file), "services.db")
+        return (self.data_file, journal.journal_path, journal.rotated_path, db_path, db_path + "-wal")
+
+    def _file_stamp(self):
+        stamp = []
+        for path in self._vault_files():
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def reload(self):
+        """(Re)load the vault and drop every cached answer."""
+        stamp = self._file_stamp()
+        vault = open_vault(self.data_file, self.backend, read_only=True)
+        try:
+            services = [dict(s) for s in vault.services]
+        finally:
+            vault.close()
+        self.engine.set_services((s["id"], s) for s in services)
+        self._services = {s["id"]: s for s in services}
+        self._by_title = {}
+        for s in services:
+            self._by_title.setdefault(s.get("title", "").lower(), s["id"])
+        self._answers = {}
+        self._stamp = stamp
+        print(f"[CodeServer] Loaded {len(services)} services from {self.data_file}")
+
+    # ── requests ──
+
+    def _resolve(self, key):
+        if not isinstance(key, str):
+            return None
+        if key in self._services:
+            return key
+        return self._by_title.get(key.lower())
+
+    def _answer(self, service_id, now):
+        """
+        (expires, code, '["123456", 1700000030]') for a service, cached until its
+        window ends; (None, None, "null") for an invalid secret until the next reload.
+        """
+        answer = self._answers.get(service_id)
+        if answer is not None and (answer[0] is None or now < answer[0]):
+            return answer
+        window = self.engine.code_window(service_id, now)
+        if window is None:
+            answer = (None, None, "null")
+        else:
+            code, expires = window[0]
+            answer = (expires, code, json.dumps([code, expires]))
+        self._answers[service_id] = answer
+        return answer
+
+    def handle(self, line):
+        """Answer one request line (bytes) with one response line (bytes)."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return json.dumps({"error": f"bad request: {e}"}).encode() + b"\n"
+        now = self.clock()
+        if "get" in request:
+            keys = request["get"]
+            if isinstance(keys, str):
+                keys = [keys]
+            if not isinstance(keys, list):
+                return b'{"error": "bad request: \\"get\\" must be a string or a list"}\n'
+            parts = []
+            for key in keys:
+                service_id = self._resolve(key)
+                parts.append("null" if service_id is None else self._answer(service_id, now)[2])
+            return ('{"codes": [' + ", ".join(parts) + "]}\n").encode()
+        if "find" in request:
+            query = request["find"]
+            if not isinstance(query, str):
+                return b'{"error": "bad request: \\"find\\" must be a string"}\n'
+            query = query.lower()
+            found = []
+            for service_id, s in self._services.items():
+                if query in s.get("title", "").lower() or query in s.get("account", "").lower():
+                    expires, code, _ = self._answer(service_id, now)
+                    found.append({"id": service_id, "title": s.get("title", ""),
+                                  "account": s.get("account", ""), "code": code, "expires": expires})
+            return json.dumps({"services": found}, ensure_ascii=False).encode() + b"\n"
+        if "ping" in request:
+            return json.dumps({"ok": True, "services": len(self._services)}).encode() + b"\n"
+        return b'{"error": "unknown request"}\n'
+
+    # ── asyncio ──
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                try:
+                    response = self.handle(line)
+                except Exception as e:
+                    # A bad request gets an error line; it never drops the connection
+                    print(f"[CodeServer] Error handling request: {e}")
+                    response = json.dumps({"error": f"internal error: {e}"}).encode() + b"\n"
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            print(f"[CodeServer] Client error: {e}")
+        finally:
+            writer.close()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.WATCH_INTERVAL)
+            if self._file_stamp() != self._stamp:
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Mid-write or temporarily unreadable: keep serving, retry next tick
+                    print(f"[CodeServer] Reload failed: {e}")
+
+    def _remove_stale_socket(self):
+        try:
+            if stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+    async def serve(self):
+        self.reload()
+        self._remove_stale_socket()
+        # Codes are secrets: the socket is created owner-only
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._client, path=self.socket_path, limit=MAX_LINE)
+        finally:
+            os.umask(umask)
+        print(f"[CodeServer] Listening on {self.socket_path}")
+        watcher = asyncio.ensure_future(self._watch())
+        try:
+            try:
+                # SIGTERM (service managers, kill) shuts down cleanly like Ctrl+C
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+            except (RuntimeError, NotImplementedError):
+                # Not the main thread (or no signal support): the caller owns shutdown
+                pass
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            self._remove_stale_socket()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+
+
+class CodeClient:
+    """Blocking client for CodeServer; keep one per thread and reuse the connection."""
+
+    def __init__(self, socket_path, timeout=5.0):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(str(socket_path))
+        self._file = self._sock.makefile("rwb")
+
+    def request(self, request):
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("code server closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    def get(self, keys):
+        """[(code, expires) or None, ...] in the order of `keys`."""
+        return [tuple(c) if c else None for c in self.request({"get": list(keys)})["codes"]]
+
+    def find(self, query):
+        return self.request({"find": query})["services"]
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,91 @@
+"""
+Lazy facade over the imaging / vision stack (numpy, PIL, OpenCV, pyzbar).
+Importing this module is free: each library is imported on first attribute
+access, so app startup does not pay for it and only QR scanning does.
+
+    from authcore.imaging import cv2, np
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)   # cv2 is imported here
+
+A missing library raises ImportError at that first access.
+"""
+
+import importlib
+import os
+import struct
+import threading
+import time
+import zlib
+
+_lock = threading.Lock()
+# module name -> import time in seconds, in load order
+import_times = {}
+
+
+class LazyModule:
+    """Module proxy that imports `name` on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is not None:
+            return module
+        with _lock:
+            module = self.__dict__["_module"]
+            if module is None:
+                t0 = time.perf_counter()
+                module = importlib.import_module(self._name)
+                import_times[self._name] = time.perf_counter() - t0
+                print(f"[imaging] {self._name} imported in {import_times[self._name] * 1e3:.0f} ms")
+                self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    @property
+    def loaded(self):
+        return self.__dict__["_module"] is not None
+
+    def available(self):
+        """True if the module can be imported (imports it)."""
+        try:
+            self._load()
+            return True
+        except ImportError:
+            return False
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+np = LazyModule("numpy")
+Image = LazyModule("PIL.Image")
+ImageOps = LazyModule("PIL.ImageOps")
+cv2 = LazyModule("cv2")
+pyzbar = LazyModule("pyzbar.pyzbar")
+
+
+def write_solid_png(path, rgba, size=4):
+    """Write a size x size PNG of one RGBA colour (stdlib only, no PIL)."""
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    row = b"\0" + bytes(rgba) * size  # filter type 0 + pixels
+    png = (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * size))
+        + chunk(b"IEND", b"")
+    )
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(png)
+    # Atomic, so a concurrent start never sees a half-written file
+    os.replace(tmp, path)
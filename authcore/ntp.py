@@ -0,0 +1,163 @@
+"""
+SNTP client (RFC 4330) — queries all servers at once over non-blocking UDP
+sockets and keeps the lowest-delay sample. No external dependencies.
+"""
+
+import collections
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+
+NTP_SERVERS = [
+    "pool.ntp.org",
+    "time.google.com",
+    "time.windows.com",
+    "time.cloudflare.com",
+]
+NTP_PORT = 123
+NTP_EPOCH = 2208988800  # seconds between 1900-01-01 and 1970-01-01
+# After the first good reply, wait at most this long for lower-delay ones
+SETTLE_TIME = 0.2
+
+NTPSample = collections.namedtuple("NTPSample", "server offset delay time")
+
+
+def _to_ntp(ts):
+    ts += NTP_EPOCH
+    return struct.pack("!II", int(ts), int((ts % 1) * 2**32))
+
+
+def _from_ntp(data):
+    sec, frac = struct.unpack("!II", data)
+    return sec - NTP_EPOCH + frac / 2**32
+
+
+def _request(origin):
+    """48-byte client request (LI=0, VN=3, Mode=3) carrying `origin` as transmit timestamp."""
+    return b"\x1b" + 39 * b"\0" + origin
+
+
+def parse_response(data, origin, t4):
+    """
+    (offset, delay) from a server reply using the four NTP timestamps:
+      offset = ((t2 - t1) + (t3 - t4)) / 2,  delay = (t4 - t1) - (t3 - t2)
+    `origin` is the transmit field we sent; replies that don't echo it
+    (stale or spoofed), kiss-of-death and unsynchronized servers give None.
+    """
+    if len(data) < 48:
+        return None
+    li, mode, stratum = data[0] >> 6, data[0] & 0x7, data[1]
+    if mode != 4 or stratum == 0 or li == 3 or data[24:32] != origin:
+        return None
+    t1 = _from_ntp(origin)
+    t2 = _from_ntp(data[32:40])
+    t3 = _from_ntp(data[40:48])
+    return ((t2 - t1) + (t3 - t4)) / 2, (t4 - t1) - (t3 - t2)
+
+
+def _resolve(server):
+    host, port = server if isinstance(server, tuple) else (server, NTP_PORT)
+    family, _, _, _, addr = socket.getaddrinfo(host, port, 0, socket.SOCK_DGRAM)[0]
+    return family, addr
+
+
+def query_ntp(servers=None, timeout=3.0):
+    """
+    Query every server concurrently; return the NTPSample with the lowest
+    round-trip delay, or None if nobody answered within `timeout` seconds
+    (total, not per server). Once one reply is in, dead servers only cost
+    SETTLE_TIME more. Servers are host names or (host, port) tuples.
+    Offsets are relative to time.time().
+    """
+    servers = list(servers or NTP_SERVERS)
+    deadline = time.monotonic() + timeout
+    sel = selectors.DefaultSelector()
+    pending = {}  # socket -> (server, origin bytes)
+    samples = []
+
+    def _send(server, family, addr):
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        # Random low bits (< 16 us) make the origin timestamp unique per request
+        t1 = time.time() + int.from_bytes(os.urandom(2), "big") / 2**32
+        origin = _to_ntp(t1)
+        try:
+            sock.sendto(_request(origin), addr)
+        except OSError:
+            sock.close()
+            return
+        pending[sock] = (server, origin)
+        sel.register(sock, selectors.EVENT_READ)
+
+    # DNS lookups block, so run them in parallel and send as each one resolves;
+    # the pool is not waited for, a hung lookup just misses the deadline
+    pool = ThreadPoolExecutor(max_workers=len(servers) or 1)
+    futures = {pool.submit(_resolve, s): s for s in servers}
+    try:
+        for fut in as_completed(futures, timeout=max(deadline - time.monotonic(), 0)):
+            try:
+                family, addr = fut.result()
+            except Exception:
+                continue
+            _send(futures[fut], family, addr)
+            # Drain answers that already arrived while we were resolving
+            _collect(sel, pending, samples, 0)
+    except FuturesTimeout:
+        pass
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    settle = None
+    while pending:
+        if samples and settle is None:
+            settle = time.monotonic() + SETTLE_TIME
+            deadline = min(deadline, settle)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        _collect(sel, pending, samples, remaining)
+
+    for sock in pending:
+        sel.unregister(sock)
+        sock.close()
+    sel.close()
+    if not samples:
+        return None
+    return min(samples, key=lambda s: s.delay)
+
+
+def _collect(sel, pending, samples, timeout):
+    for key, _ in sel.select(timeout):
+        sock = key.fileobj
+        try:
+            data = sock.recv(1024)
+        except OSError:
+            data = b""
+        t4 = time.time()
+        server, origin = pending.pop(sock)
+        sel.unregister(sock)
+        sock.close()
+        result = parse_response(data, origin, t4)
+        if result is not None:
+            samples.append(NTPSample(server, result[0], result[1], t4))
+
+
+def check_ntp_offset(callback, timeout=5, servers=None):
+    """
+    Check system clock offset against NTP servers in a background thread.
+    Calls callback(offset_seconds) on completion, or callback(None) on failure.
+    """
+    def _worker():
+        try:
+            sample = query_ntp(servers, timeout)
+        except Exception as e:
+            print(f"[ntp] query failed: {e}")
+            sample = None
+        callback(sample.offset if sample is not None else None)
+
+    thread = threading.Thread(target=_worker, daemon=True)
+    thread.start()
@@ -0,0 +1,47 @@
+"""
+otpauth:// key URI parsing (the format in authenticator QR codes):
+
+    otpauth://totp/Issuer:account?secret=BASE32&issuer=Issuer&period=30&digits=6&algorithm=SHA1
+"""
+
+import urllib.parse
+
+from authcore.totp import normalize_secret, otp_params
+
+SCHEME = "otpauth://"
+
+
+def parse_otpauth(uri):
+    """
+    Parse an otpauth:// URI into a dict with secret, issuer, account, title,
+    period, digits and algorithm (unsupported values fall back to the
+    defaults, see otp_params). Raises ValueError if it is not an otpauth URI.
+    """
+    uri = (uri or "").strip()
+    if not uri.lower().startswith(SCHEME):
+        raise ValueError("expected otpauth:// URI")
+    parsed = urllib.parse.urlparse(uri)
+    params = urllib.parse.parse_qs(parsed.query)
+
+    def param(key):
+        return (params.get(key, [""]) or [""])[0]
+
+    issuer = param("issuer")
+    label = urllib.parse.unquote((parsed.path or "").lstrip("/").replace("totp/", "").strip())
+    if ":" in label:
+        parts = label.split(":", 1)
+        if not issuer:
+            issuer = parts[0].strip()
+        account = parts[1].strip() if len(parts) > 1 else ""
+    else:
+        account = label.strip()
+    period, digits, algorithm = otp_params({key: param(key) for key in ("period", "digits", "algorithm")})
+    return {
+        "secret": normalize_secret(param("secret")),
+        "issuer": issuer,
+        "account": account,
+        "title": issuer or account or "unknown",
+        "period": period,
+        "digits": digits,
+        "algorithm": algorithm,
+    }
@@ -0,0 +1,521 @@
+"""
+Live QR scanning support that does not need Kivy.
+
+DecodeWorker runs every decode of the camera preview on one long-lived
+thread. Frames come in through a one-slot mailbox where the latest frame
+wins, so a slow decode never queues up stale frames and two decodes never
+run at the same time. FrameIngest turns the raw texture bytes into the
+grayscale image the decoders want without per-frame allocations.
+QRDecoder holds what the decoders reuse from frame to frame: detectors,
+zbar scanners, the morphology kernel and scratch images. DecodeCascade
+decides which decode variants a frame gets, and in what order.
+"""
+
+import json
+import os
+import threading
+import time
+from ctypes import c_void_p, string_at
+
+from authcore.imaging import cv2, np, pyzbar
+
+
+class DecodeWorker:
+    """
+    decode(frame) -> str or None runs on the worker thread. The first non-empty
+    result is passed to on_result(data) (also on the worker thread); after that
+    the worker ignores frames until start() is called again.
+    stop() cancels: the waiting frame is dropped and the result of a decode that
+    is still running is discarded.
+    """
+
+    def __init__(self, decode, on_result, name="qr-decode"):
+        self._decode = decode
+        self._on_result = on_result
+        self._name = name
+        self._cond = threading.Condition()
+        self._frame = None
+        self._generation = 0
+        self._active = False
+        self._thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.submitted = 0
+        self.dropped = 0
+        self.decoded = 0
+        self.decode_time = 0.0
+
+    def start(self):
+        """Accept frames (again); starts the thread if it is not running."""
+        with self._cond:
+            self._generation += 1
+            self._frame = None
+            self._active = True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self):
+        """Stop taking frames; the thread exits once the current decode (if any) returns."""
+        with self._cond:
+            self._generation += 1
+            if self._frame is not None:
+                self.dropped += 1
+                self._frame = None
+            self._active = False
+            self._cond.notify()
+
+    @property
+    def active(self):
+        return self._active
+
+    def submit(self, frame):
+        """Offer a frame; replaces (drops) one that is still waiting. False if inactive."""
+        with self._cond:
+            if not self._active:
+                return False
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.submitted += 1
+            self._cond.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._active and self._frame is None:
+                    self._cond.wait()
+                if not self._active:
+                    if self._thread is threading.current_thread():
+                        self._thread = None
+                    return
+                frame, self._frame = self._frame, None
+                generation = self._generation
+            t0 = time.perf_counter()
+            try:
+                data = self._decode(frame)
+            except Exception as e:
+                print(f"[DecodeWorker] decode error: {e}")
+                data = None
+            frame = None
+            with self._cond:
+                self.decoded += 1
+                self.decode_time += time.perf_counter() - t0
+                if generation != self._generation or not data:
+                    continue
+                # One result per start(): stop taking frames until restarted
+                self._active = False
+                if self._frame is not None:
+                    self.dropped += 1
+                    self._frame = None
+            self._on_result(data)
+
+    def stats(self):
+        avg = self.decode_time / self.decoded * 1e3 if self.decoded else 0.0
+        return (f"submitted {self.submitted}, decoded {self.decoded}, "
+                f"dropped {self.dropped}, avg decode {avg:.0f} ms")
+
+
+class FrameIngest:
+    """
+    Camera texture bytes (RGBA or RGB rows) -> contiguous uint8 grayscale.
+    Luma is the usual weighted R/G/B sum (cv2.cvtColor), so codes printed in
+    colour keep their contrast. The texture buffer is read in place and
+    converted straight into a buffer that is reused while the frame size
+    stays the same; the bottom-up row order of OpenGL textures is undone by
+    flipping that buffer in place. The returned array is overwritten by the
+    next call. Asking again for the same bytes object returns the buffer as
+    is, or only re-flips it when the other row order is wanted.
+    """
+
+    def __init__(self):
+        self._gray = None
+        self._source = None  # (pixels, flip) the buffer holds, for immutable bytes
+        self.allocations = 0
+
+    @staticmethod
+    def frame_view(pixels, w, h):
+        """Zero-copy (h, w, channels) view of the texture bytes, rows in buffer order."""
+        channels = 4 if len(pixels) >= w * h * 4 else 3
+        return np.frombuffer(pixels, dtype=np.uint8, count=w * h * channels).reshape(h, w, channels)
+
+    def gray(self, pixels, w, h, flip=True):
+        if self._gray is None or self._gray.shape != (h, w):
+            self._gray = np.empty((h, w), dtype=np.uint8)
+            self._source = None
+            self.allocations += 1
+        elif self._source is not None and self._source[0] is pixels:
+            if self._source[1] != flip:
+                cv2.flip(self._gray, 0, dst=self._gray)
+                self._source = (pixels, flip)
+            return self._gray
+        frame = self.frame_view(pixels, w, h)
+        code = cv2.COLOR_RGBA2GRAY if frame.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+        cv2.cvtColor(frame, code, dst=self._gray)
+        if flip:
+            cv2.flip(self._gray, 0, dst=self._gray)
+        self._source = (pixels, flip) if isinstance(pixels, bytes) else None
+        return self._gray
+
+
+class _ZBarScanner:
+    """
+    One zbar image scanner with only QR codes enabled, reused for every scan
+    (pyzbar.decode creates and configures a new one per call). Not thread-safe:
+    QRDecoder keeps one per thread.
+    """
+
+    def __init__(self):
+        self._handle = pyzbar.zbar_image_scanner_create()
+        if not self._handle:
+            raise RuntimeError("Could not create zbar image scanner")
+        for symbol in pyzbar.ZBarSymbol:
+            enable = 1 if symbol == pyzbar.ZBarSymbol.QRCODE else 0
+            pyzbar.zbar_image_scanner_set_config(self._handle, symbol, pyzbar.ZBarConfig.CFG_ENABLE, enable)
+
+    def scan(self, gray):
+        """First QR code in a uint8 (h, w) image as str, or None."""
+        gray = np.ascontiguousarray(gray)  # no copy for buffers we own
+        h, w = gray.shape
+        image = pyzbar.zbar_image_create()
+        if not image:
+            raise RuntimeError("Could not create zbar image")
+        try:
+            pyzbar.zbar_image_set_format(image, pyzbar._FOURCC["L800"])
+            pyzbar.zbar_image_set_size(image, w, h)
+            # zbar reads the array in place; `gray` outlives the scan
+            pyzbar.zbar_image_set_data(image, c_void_p(gray.ctypes.data), gray.size, None)
+            if pyzbar.zbar_scan_image(self._handle, image) < 0:
+                raise RuntimeError("Unsupported image format")
+            symbol = pyzbar.zbar_image_first_symbol(image)
+            if not symbol:
+                return None
+            data = string_at(pyzbar.zbar_symbol_get_data(symbol), pyzbar.zbar_symbol_get_data_length(symbol))
+            return data.decode("utf-8", errors="ignore") or None
+        finally:
+            pyzbar.zbar_image_destroy(image)
+
+    def __del__(self):
+        if getattr(self, "_handle", None):
+            pyzbar.zbar_image_scanner_destroy(self._handle)
+            self._handle = None
+
+
+class QRDecoder:
+    """
+    Decoding context shared by the camera and the still-image paths; create one
+    and keep it for the life of the app. OpenCV detectors, zbar scanners and
+    scratch images are per thread (the camera decodes on the DecodeWorker
+    thread, photos on the UI thread), so no call takes a lock. Images returned
+    by binarize() are scratch buffers, overwritten by the next call on the
+    same thread.
+
+    read(gray) is zbar when pyzbar and the zbar library are there, else the
+    OpenCV detector; which one is decided once.
+    """
+
+    # qweenQR preprocessing: darken, adaptive threshold, close/open, blur
+    DARKEN = 0.6
+    THRESHOLD_BLOCK = 11
+    THRESHOLD_C = 2
+    BLUR = (5, 5)
+    # Still images: long side (px) of the levels tried before the full image
+    PYRAMID = (640, 1280, 2560)
+    # Margin around a located code when it is cut out of the full image, in code sizes
+    CROP_MARGIN = 0.5
+
+    def __init__(self):
+        self._local = threading.local()
+        self._kernel = None
+        self._has_zbar = None
+
+    @property
+    def kernel(self):
+        if self._kernel is None:
+            self._kernel = np.ones((3, 3), np.uint8)
+        return self._kernel
+
+    @property
+    def has_zbar(self):
+        if self._has_zbar is None:
+            self._has_zbar = pyzbar.available()
+        return self._has_zbar
+
+    def detector(self):
+        """This thread's cv2.QRCodeDetector."""
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = cv2.QRCodeDetector()
+        return detector
+
+    def _scanner(self):
+        scanner = getattr(self._local, "scanner", None)
+        if scanner is None:
+            scanner = self._local.scanner = _ZBarScanner()
+        return scanner
+
+    def _scratch(self, name, shape):
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buf = buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buf
+
+    def opencv(self, image):
+        data, _, _ = self.detector().detectAndDecode(image)
+        return data or None
+
+    def zbar(self, gray):
+        return self._scanner().scan(gray)
+
+    def read(self, gray):
+        return self.zbar(gray) if self.has_zbar else self.opencv(gray)
+
+    def binarize(self, gray):
+        """qweenQR preprocessing of a uint8 (h, w) image, computed in scratch buffers."""
+        dark = self._scratch("dark", gray.shape)
+        binary = self._scratch("binary", gray.shape)
+        cv2.multiply(gray, self.DARKEN, dst=dark)
+        cv2.adaptiveThreshold(dark, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                              self.THRESHOLD_BLOCK, self.THRESHOLD_C, dst=binary)
+        cv2.morphologyEx(binary, cv2.MORPH_CLOSE, self.kernel, dst=binary)
+        cv2.morphologyEx(binary, cv2.MORPH_OPEN, self.kernel, dst=binary)
+        # `dark` is free again: blur into it
+        return cv2.GaussianBlur(binary, self.BLUR, 0, dst=dark)
+
+    # ── still images ──
+
+    def pyramid(self, gray):
+        """(scale, image) for each PYRAMID level smaller than `gray`, smallest first, then (1.0, gray)."""
+        long_side = max(gray.shape[:2])
+        for side in self.PYRAMID:
+            # Skip levels within 1.5x of the next one up: little new detail for the cost
+            if side * 1.5 > long_side:
+                break
+            scale = side / long_side
+            yield scale, cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        yield 1.0, gray
+
+    def _locate(self, image):
+        """(data, points): OpenCV detect + decode; points (4, 2) when a code was found."""
+        detector = self.detector()
+        found, points = detector.detect(image)
+        if not found or points is None:
+            return None, None
+        data, _ = detector.decode(image, points)
+        return data or None, points.reshape(-1, 2)
+
+    def _decode_region(self, gray, points):
+        """Decode the code at `points` (full-image coordinates) from a full-resolution crop."""
+        h, w = gray.shape[:2]
+        (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+        margin = self.CROP_MARGIN * max(x1 - x0, y1 - y0)
+        left, top = max(0, int(x0 - margin)), max(0, int(y0 - margin))
+        right, bottom = min(w, int(x1 + margin) + 1), min(h, int(y1 + margin) + 1)
+        crop = np.ascontiguousarray(gray[top:bottom, left:right])
+        # The corners are known: decode() skips detection
+        data, _ = self.detector().decode(crop, (points - (left, top)).astype(np.float32).reshape(1, -1, 2))
+        if data:
+            return data
+        return self.opencv(crop) or (self.zbar(crop) if self.has_zbar else None)
+
+    def decode_still(self, gray):
+        """
+        QR text in a grayscale photo of any size, or None. The pyramid levels
+        below full size are searched smallest first; a code located on one of
+        them is decoded from a crop of the full image, so its modules keep
+        their full resolution. If none finds it, a contrast-equalized mid
+        level is tried as is and rotated, and only then the full image (the
+        old path: equalizeHist + blur at full size).
+        """
+        levels = []
+        for scale, level in self.pyramid(gray):
+            if scale == 1.0 and levels:
+                break  # full size comes last, after the cheap retries below
+            data = self._search(gray, level, scale)
+            if data:
+                return data
+            levels.append(level)
+        mid = cv2.equalizeHist(levels[min(1, len(levels) - 1)])
+        for image in (mid, cv2.rotate(mid, cv2.ROTATE_90_CLOCKWISE),
+                      cv2.rotate(mid, cv2.ROTATE_90_COUNTERCLOCKWISE), cv2.rotate(mid, cv2.ROTATE_180)):
+            data = self.opencv(image)
+            if data:
+                return data
+        if levels[0] is gray:
+            return None  # small image: it was searched as is
+        return self._search(gray, cv2.GaussianBlur(cv2.equalizeHist(gray), (3, 3), 0), 1.0)
+
+    def _search(self, gray, level, scale):
+        """One pyramid level: OpenCV on the level, the full-size crop it points to, zbar."""
+        data, points = self._locate(level)
+        if data:
+            return data
+        if points is not None and scale < 1.0:
+            data = self._decode_region(gray, points / scale)
+            if data:
+                return data
+        return self.zbar(level) if self.has_zbar else None
+
+
+class DecodeCascade:
+    """
+    Tries decode stages on a frame, one after another, until one returns a
+    result or the frame's time budget is spent.
+
+    stages: [(name, decode(frame) -> str or None)] in their initial order.
+    For each stage the attempts, hits and decode time are counted and saved
+    to `path` (next to services.json, so the counts are per device). Stages
+    run in order of (hits + PRIOR_HITS) / (seconds + PRIOR_TIME): the stage
+    that finds codes on this device for the least time goes first. A stage
+    with little history scores high, so one the budget keeps cutting off
+    still gets a turn at the front. run() is called from the decode thread,
+    the rest from any thread.
+    """
+
+    # Decode seconds per frame; the first stage always runs, later ones only if
+    # their average time still fits
+    BUDGET = 0.25
+    PRIOR_HITS = 1.0
+    PRIOR_TIME = 1.0
+    # Counters are halved past this many attempts so old conditions fade out
+    MAX_ATTEMPTS = 2000
+
+    def __init__(self, stages, path=None, budget=None):
+        self._stages = dict(stages)
+        self.path = path
+        self.budget = self.BUDGET if budget is None else budget
+        self._lock = threading.Lock()
+        self._counts = {name: [0, 0, 0.0] for name in self._stages}  # attempts, hits, seconds
+        self._order = list(self._stages)
+        self._logged_err = set()
+        self.reset_stats()
+        self.load()
+
+    def reset_stats(self):
+        """Per-scan counters (the per-stage history is kept)."""
+        self.frames = 0
+        self.over_budget = 0
+
+    # ── persistence ──
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f).get("stages", {})
+            with self._lock:
+                for name, counts in saved.items():
+                    if name in self._counts:
+                        attempts, hits, seconds = counts[:3]
+                        self._counts[name] = [int(attempts), int(hits), float(seconds)]
+                self._reorder()
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"stages": {name: list(c) for name, c in self._counts.items()}}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[DecodeCascade] Error saving stage stats: {e}")
+
+    # ── ordering ──
+
+    def _score(self, name):
+        _, hits, seconds = self._counts[name]
+        return (hits + self.PRIOR_HITS) / (seconds + self.PRIOR_TIME)
+
+    def _reorder(self):
+        # Stable: ties keep the configured order
+        self._order = sorted(self._stages, key=self._score, reverse=True)
+
+    @property
+    def order(self):
+        return list(self._order)
+
+    def _record(self, name, seconds, hit):
+        with self._lock:
+            counts = self._counts[name]
+            counts[0] += 1
+            counts[1] += hit
+            counts[2] += seconds
+            if counts[0] > self.MAX_ATTEMPTS:
+                counts[0] //= 2
+                counts[1] //= 2
+                counts[2] /= 2
+
+    # ── decoding ──
+
+    def run(self, frame):
+        """Result of the first stage that decodes `frame`, or None."""
+        self.frames += 1
+        start = time.perf_counter()
+        data = None
+        for i, name in enumerate(self._order):
+            if i:
+                attempts, _, seconds = self._counts[name]
+                expected = seconds / attempts if attempts else 0.0
+                if time.perf_counter() - start + expected > self.budget:
+                    self.over_budget += 1
+                    continue
+            t0 = time.perf_counter()
+            try:
+                data = self._stages[name](frame)
+            except Exception as e:
+                if name not in self._logged_err:
+                    self._logged_err.add(name)
+                    print(f"[DecodeCascade] {name} error: {e}")
+                data = None
+            self._record(name, time.perf_counter() - t0, bool(data))
+            if data:
+                break
+        with self._lock:
+            self._reorder()
+        return data
+
+    def stats(self):
+        with self._lock:
+            parts = []
+            for name in self._order:
+                attempts, hits, seconds = self._counts[name]
+                avg = seconds / attempts * 1e3 if attempts else 0.0
+                parts.append(f"{name} {hits}/{attempts} {avg:.0f} ms")
+        return f"frames {self.frames}, stages skipped for budget {self.over_budget}; " + ", ".join(parts)
+
+
+def camera_stages(decoder, ingest):
+    """
+    Every decode stage for camera frames (pixels, w, h), by name:
+    "<flip|plain>/<qween|raw|opencv>". flip reads the texture rows bottom-up
+    (OpenGL order, usually right); qween is QRDecoder.binarize() then read(),
+    raw is read() on the grayscale frame, opencv the OpenCV detector on it.
+    """
+    def stage(flip, variant):
+        def decode(frame):
+            pixels, w, h = frame
+            gray = ingest.gray(pixels, w, h, flip)
+            if variant == "qween":
+                return decoder.read(decoder.binarize(gray))
+            if variant == "opencv":
+                return decoder.opencv(gray)
+            return decoder.read(gray)
+        return decode
+
+    return {
+        f"{'flip' if flip else 'plain'}/{variant}": stage(flip, variant)
+        for flip in (True, False)
+        for variant in ("qween", "raw", "opencv")
+    }
@@ -0,0 +1,169 @@
+"""
+SQLite vault backend (stdlib sqlite3) for large service lists.
+Services live in one indexed table keyed by the stable service id; the
+rarely used url/backup_codes columns are not loaded with the list and are
+fetched per service on demand. Same store interface as JournalStore.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import urllib.parse
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    account TEXT NOT NULL DEFAULT '',
+    secret TEXT NOT NULL DEFAULT '',
+    period INTEGER,
+    digits INTEGER,
+    algorithm TEXT,
+    url TEXT NOT NULL DEFAULT '',
+    backup_codes TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS services_position ON services(position);
+CREATE INDEX IF NOT EXISTS services_title ON services(title COLLATE NOCASE, account COLLATE NOCASE);
+"""
+
+# PRAGMA user_version once the schema exists and services.json is imported;
+# written in the same transaction, so a crash mid-import leaves 0 and the
+# import is redone (idempotently) on the next open
+SCHEMA_VERSION = 1
+
+_LIST_COLUMNS = ("id", "title", "account", "secret", "period", "digits", "algorithm", "extra")
+_COLUMNS = _LIST_COLUMNS[:-1] + ("url", "backup_codes")
+
+
+class SQLiteStore:
+    """
+    services.db; `migrate_from` (a JournalStore) is imported together with the
+    schema creation, in one transaction. read_only=True opens an existing db
+    without writing to it.
+    """
+
+    lazy_fields = ("url", "backup_codes")
+
+    def __init__(self, path, migrate_from=None, read_only=False):
+        self.path = str(path)
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if read_only:
+            uri = f"file:{urllib.parse.quote(self.path)}?mode=ro"
+            self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        # Writes may come from a background saver thread; access is serialized by _lock
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        if self._user_version(self._db) < SCHEMA_VERSION:
+            self._create(migrate_from)
+
+    @staticmethod
+    def _user_version(db):
+        return db.execute("PRAGMA user_version").fetchone()[0]
+
+    @staticmethod
+    def is_complete(path):
+        """True if the db at `path` exists and finished its schema creation / import."""
+        if not os.path.exists(path):
+            return False
+        try:
+            db = sqlite3.connect(f"file:{urllib.parse.quote(str(path))}?mode=ro", uri=True)
+            try:
+                return SQLiteStore._user_version(db) >= SCHEMA_VERSION
+            finally:
+                db.close()
+        except sqlite3.Error:
+            return False
+
+    def _create(self, json_store):
+        """Schema + import of `json_store` + version marker, all or nothing."""
+        records = []
+        if json_store is not None and any(
+            os.path.exists(p) for p in (json_store.path, json_store.journal_path, json_store.rotated_path)
+        ):
+            records = json_store.load()
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    self._db.execute(statement)
+            # Upserts: redoing an import that was interrupted is harmless
+            for pos, record in enumerate(records):
+                self._put(record["id"], record, pos)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if not records:
+            return
+        print(f"[SQLiteStore] Migrated {len(records)} services from {json_store.path}")
+        # One source of truth: keep the JSON only as a backup
+        try:
+            os.replace(json_store.path, json_store.path + ".migrated")
+        except OSError:
+            pass
+
+    @staticmethod
+    def _row_to_record(row, columns):
+        record = {}
+        for name, value in zip(columns, row):
+            if name == "extra":
+                if value:
+                    record.update(json.loads(value))
+            elif value is not None:
+                record[name] = value
+        return record
+
+    def load(self):
+        """All services in order, without the lazy columns."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_LIST_COLUMNS)} FROM services ORDER BY position"
+            ).fetchall()
+        return [self._row_to_record(row, _LIST_COLUMNS) for row in rows]
+
+    def load_lazy(self, service_id):
+        """url/backup_codes of one service."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, backup_codes FROM services WHERE id = ?", (service_id,)
+            ).fetchone()
+        return {} if row is None else dict(zip(self.lazy_fields, row))
+
+    def _put(self, service_id, data, position=None):
+        known = {c: data.get(c) for c in _COLUMNS if c != "id"}
+        extra = {k: v for k, v in data.items() if k not in _COLUMNS}
+        values = (
+            service_id, known["title"] or "", known["account"] or "", known["secret"] or "",
+            known["period"], known["digits"], known["algorithm"],
+            known["url"] or "", known["backup_codes"] or "",
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+        if position is None:
+            position = self._db.execute("SELECT COALESCE(MAX(position), -1) + 1 FROM services").fetchone()[0]
+        self._db.execute(
+            "INSERT INTO services (id, title, account, secret, period, digits, algorithm, url, backup_codes, extra, position)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET title=excluded.title, account=excluded.account,"
+            " secret=excluded.secret, period=excluded.period, digits=excluded.digits,"
+            " algorithm=excluded.algorithm, url=excluded.url, backup_codes=excluded.backup_codes,"
+            " extra=excluded.extra",
+            values + (position,),
+        )
+
+    def write(self, ops, records=None):
+        """Apply journal-style ops in one transaction."""
+        if self.read_only:
+            raise OSError(f"{self.path} is opened read-only")
+        with self._lock, self._db:
+            for op in ops:
+                if op["op"] == "put":
+                    self._put(op["id"], op.get("data") or {})
+                elif op["op"] == "del":
+                    self._db.execute("DELETE FROM services WHERE id = ?", (op["id"],))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,75 @@
+"""
+Where the vault lives and whole-list load/save helpers, without the GUI.
+The app points it at App.user_data_dir (set_data_dir); scripts use
+AUTHENTICATOR_DATA_DIR or the same per-user directory Kivy would pick.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from authcore.vault import open_vault
+
+APP_NAME = "authenticator"
+DATA_FILE_NAME = "services.json"
+
+# Vault backend: "json" (services.json + journal) or "sqlite" (services.db, migrated
+# from services.json on first use); None = sqlite if services.db exists, else json
+VAULT_BACKEND = os.environ.get("AUTHENTICATOR_VAULT") or None
+
+_data_file = None
+
+
+def default_data_dir():
+    """AUTHENTICATOR_DATA_DIR, else the desktop App.user_data_dir of the app."""
+    env = os.environ.get("AUTHENTICATOR_DATA_DIR")
+    if env:
+        return Path(env)
+    if sys.platform == "win32":
+        return Path(os.environ.get("APPDATA", "~")).expanduser() / APP_NAME
+    if sys.platform == "darwin":
+        return Path("~/Library/Application Support").expanduser() / APP_NAME
+    return Path(os.environ.get("XDG_CONFIG_HOME", "~/.config")).expanduser() / APP_NAME
+
+
+def get_data_file():
+    """Path of services.json (other vault files sit next to it)."""
+    global _data_file
+    if _data_file is None:
+        _data_file = default_data_dir() / DATA_FILE_NAME
+    return _data_file
+
+
+def set_data_dir(directory):
+    """Set data directory (called from App.build with user_data_dir on Android)."""
+    global _data_file
+    d = Path(directory)
+    d.mkdir(parents=True, exist_ok=True)
+    _data_file = d / DATA_FILE_NAME
+
+
+def load_services():
+    """Load the full services list from whichever backend holds it. The app itself uses a Vault."""
+    try:
+        vault = open_vault(get_data_file(), VAULT_BACKEND)
+    except Exception as e:
+        print(f"[storage] Error loading services: {e}")
+        return []
+    try:
+        return [vault.get_full(s["id"]) for s in vault.services]
+    finally:
+        vault.close()
+
+
+def save_services(services):
+    """Atomically replace the whole vault with `services`."""
+    data_file = get_data_file()
+    try:
+        data_file.parent.mkdir(parents=True, exist_ok=True)
+        vault = open_vault(data_file, VAULT_BACKEND)
+        try:
+            vault.replace_all(services)
+        finally:
+            vault.close()
+    except Exception as e:
+        print(f"[storage] Error saving services: {e}")
@@ -0,0 +1,285 @@
+"""
+Batched TOTP engine (RFC 6238) — no Kivy, no pyotp.
+Secrets are decoded to key bytes once; codes are computed for all services
+of a time window in one pass and served from cache until the window ends.
+"""
+
+import base64
+import hmac
+import struct
+import time
+
+DEFAULT_PERIOD = 30
+DEFAULT_DIGITS = 6
+DEFAULT_ALGORITHM = "SHA1"
+# Timers for a window boundary fire this much later (s), so the new window is already current
+BOUNDARY_SLACK = 0.05
+
+_DIGESTS = {
+    "SHA1": "sha1",
+    "SHA256": "sha256",
+    "SHA512": "sha512",
+}
+_VALID_DIGITS = (6, 7, 8)
+
+
+def normalize_secret(secret):
+    """Strip spaces and upper-case a Base32 secret (same as the UI does before saving)."""
+    return (secret or "").replace(" ", "").upper()
+
+
+def decode_secret(secret):
+    """Decode a Base32 secret to key bytes. Raises ValueError on invalid input."""
+    clean = normalize_secret(secret)
+    if not clean:
+        raise ValueError("empty secret")
+    clean += "=" * (-len(clean) % 8)
+    try:
+        return base64.b32decode(clean, casefold=True)
+    except Exception as e:
+        raise ValueError(f"invalid Base32 secret: {e}")
+
+
+def hotp(key, counter, digits=DEFAULT_DIGITS, digest="sha1"):
+    """HOTP value (RFC 4226) for raw key bytes and an integer counter."""
+    return _compute(_Entry(key, digits, digest), struct.pack(">Q", counter))
+
+
+def otp_params(service):
+    """
+    (period, digits, algorithm) of a service record, falling back to the
+    defaults for missing or unsupported values.
+    """
+    try:
+        period = int(service.get("period") or DEFAULT_PERIOD)
+    except (TypeError, ValueError):
+        period = DEFAULT_PERIOD
+    if period <= 0:
+        period = DEFAULT_PERIOD
+    try:
+        digits = int(service.get("digits") or DEFAULT_DIGITS)
+    except (TypeError, ValueError):
+        digits = DEFAULT_DIGITS
+    if digits not in _VALID_DIGITS:
+        digits = DEFAULT_DIGITS
+    algorithm = str(service.get("algorithm") or DEFAULT_ALGORITHM).upper().replace("-", "")
+    if algorithm not in _DIGESTS:
+        algorithm = DEFAULT_ALGORITHM
+    return period, digits, algorithm
+
+
+def format_code(code):
+    """Split a code in two halves for readability: "123 456", "1234 5678"."""
+    if not code:
+        return code
+    half = len(code) // 2
+    return f"{code[:half]} {code[half:]}"
+
+
+class _Entry:
+    __slots__ = ("key", "digits", "digest")
+
+    def __init__(self, key, digits, digest):
+        self.key = key
+        self.digits = digits
+        self.digest = digest
+
+
+def _compute(entry, msg):
+    """Code for a decoded entry and a packed counter; None for invalid secrets."""
+    if entry is None:
+        return None
+    mac = hmac.digest(entry.key, msg, entry.digest)
+    offset = mac[-1] & 0x0F
+    value = struct.unpack(">I", mac[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(value % (10 ** entry.digits)).zfill(entry.digits)
+
+
+class _Group:
+    """
+    All services sharing one period: one counter, one batch of codes, plus the
+    next window's batch once prepare() has run. `generation` is bumped on every
+    mutation so a lookahead batch computed before an edit is never used.
+    """
+
+    __slots__ = ("period", "entries", "counter", "codes", "generation", "prepared")
+
+    def __init__(self, period):
+        self.period = period
+        self.entries = {}
+        self.counter = None
+        self.codes = {}
+        self.generation = 0
+        self.prepared = None  # (counter, generation, codes)
+
+    def _batch(self, counter):
+        msg = struct.pack(">Q", counter)
+        # list() snapshots the dict so a concurrent edit can't break iteration
+        return {k: _compute(entry, msg) for k, entry in list(self.entries.items())}
+
+    def _prepared_for(self, counter):
+        prepared = self.prepared
+        if prepared is not None and prepared[0] == counter and prepared[1] == self.generation:
+            return prepared[2]
+        return None
+
+    def refresh(self, now):
+        counter = int(now // self.period)
+        if counter == self.counter:
+            return False
+        codes = self._prepared_for(counter)
+        self.codes = codes if codes is not None else self._batch(counter)
+        self.counter = counter
+        self.prepared = None
+        return True
+
+    def prepare(self, counter):
+        """Compute the batch for `counter` ahead of time (safe to call off the UI thread)."""
+        generation = self.generation
+        codes = self._batch(counter)
+        self.prepared = (counter, generation, codes)
+
+
+class TOTPEngine:
+    """
+    Holds decoded keys for every service and a per-window code cache.
+    Services are addressed by a caller-chosen key (list index, service id...)
+    and grouped by period: each group is recomputed in one batch when its
+    window rolls over, so a 60 s group is not touched at 30 s boundaries.
+    code(key) is a dict lookup in between.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._groups = {}  # period -> _Group
+        self._periods = {}  # key -> period
+
+    def set_services(self, items):
+        """Replace all services. items: iterable of (key, service_dict)."""
+        self._groups = {}
+        self._periods = {}
+        for key, service in items:
+            period, entry = self._make_entry(service)
+            self._group(period).entries[key] = entry
+            self._periods[key] = period
+
+    def update(self, key, service):
+        """Add or replace a single service (only its code is recomputed)."""
+        self.remove(key)
+        period, entry = self._make_entry(service)
+        group = self._group(period)
+        group.entries[key] = entry
+        group.generation += 1
+        self._periods[key] = period
+        if group.counter is not None:
+            group.codes[key] = _compute(entry, struct.pack(">Q", group.counter))
+
+    def remove(self, key):
+        period = self._periods.pop(key, None)
+        if period is None:
+            return
+        group = self._groups[period]
+        group.entries.pop(key, None)
+        group.codes.pop(key, None)
+        group.generation += 1
+        if not group.entries:
+            del self._groups[period]
+
+    def __len__(self):
+        return len(self._periods)
+
+    def _group(self, period):
+        group = self._groups.get(period)
+        if group is None:
+            group = self._groups[period] = _Group(period)
+        return group
+
+    @staticmethod
+    def _make_entry(service):
+        period, digits, algorithm = otp_params(service)
+        try:
+            key = decode_secret(service.get("secret", ""))
+        except ValueError:
+            return period, None
+        return period, _Entry(key, digits, _DIGESTS[algorithm])
+
+    def periods(self):
+        """Periods (seconds) of all current groups."""
+        return list(self._groups)
+
+    def period(self, key):
+        return self._periods.get(key, DEFAULT_PERIOD)
+
+    def refresh(self, now=None):
+        """Recompute every group whose window changed. Returns the periods that rolled over."""
+        if now is None:
+            now = self._clock()
+        return [p for p, group in self._groups.items() if group.refresh(now)]
+
+    def code(self, key, now=None):
+        """Current code for a service, or None if its secret is invalid/unknown."""
+        period = self._periods.get(key)
+        if period is None:
+            return None
+        group = self._groups[period]
+        group.refresh(self._clock() if now is None else now)
+        return group.codes.get(key)
+
+    def prepare_next(self, now=None, within=None):
+        """
+        Precompute the next window's codes for the groups whose boundary is at
+        most `within` seconds away (every group when None), unless already
+        prepared. Meant to run in a background thread shortly before a
+        boundary; the following refresh() then just swaps the prepared dict in.
+        """
+        if now is None:
+            now = self._clock()
+        for period, group in list(self._groups.items()):
+            if within is not None and self.remaining(now, period) > within:
+                continue
+            counter = int(now // period) + 1
+            if group._prepared_for(counter) is None:
+                group.prepare(counter)
+
+    def code_window(self, key, now=None):
+        """
+        ((code, expires_at), (next_code, next_expires_at)) for a service,
+        timestamps on the engine clock; None if its secret is invalid/unknown.
+        """
+        period = self._periods.get(key)
+        if period is None:
+            return None
+        group = self._groups[period]
+        group.refresh(self._clock() if now is None else now)
+        code = group.codes.get(key)
+        if code is None:
+            return None
+        counter = group.counter + 1
+        prepared = group._prepared_for(counter)
+        next_code = prepared.get(key) if prepared is not None else None
+        if next_code is None:
+            next_code = _compute(group.entries[key], struct.pack(">Q", counter))
+        expires = counter * period
+        return (code, expires), (next_code, expires + period)
+
+    def codes(self, now=None):
+        """Dict of key -> current code for every service."""
+        self.refresh(now)
+        out = {}
+        for group in self._groups.values():
+            out.update(group.codes)
+        return out
+
+    def period_codes(self, period, now=None):
+        """Dict of key -> current code for the services of one period group."""
+        group = self._groups.get(period)
+        if group is None:
+            return {}
+        group.refresh(self._clock() if now is None else now)
+        return dict(group.codes)
+
+    def remaining(self, now=None, period=DEFAULT_PERIOD):
+        """Seconds left in the current window of the given period."""
+        if now is None:
+            now = self._clock()
+        return period - (now % period)
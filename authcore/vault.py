@@ -0,0 +1,489 @@
+"""
+Vault storage: services.json snapshot + append-only services.journal.
+Each mutation appends one checksummed line to the journal; the snapshot is
+rewritten (atomically) only by background compaction. Loading replays the
+journal over the snapshot, so a crash loses at most a torn last line.
+open_vault() can instead use the SQLite backend (authcore.sqlite_store).
+
+Store interface (JournalStore, SQLiteStore): load(), write(ops, records),
+load_lazy(id), lazy_fields, close().
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+
+
+def new_service_id():
+    return uuid.uuid4().hex
+
+
+def legacy_service_id(position, record):
+    """
+    Id for a record saved before ids existed: derived from its position and
+    secret, so every reader (including read-only ones, which cannot save it)
+    gets the same id, and it stays the same once the app writes it out.
+    """
+    key = f"{position}:{record.get('secret', '')}".encode("utf-8")
+    return hashlib.sha256(key).hexdigest()[:32]
+
+
+def _fsync_write(path, data):
+    """Write bytes to path atomically: temp file + fsync + rename."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _encode_op(op):
+    payload = json.dumps(op, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return b"%08x " % zlib.crc32(payload) + payload + b"\n"
+
+
+def _decode_ops(data):
+    """
+    (ops, length) of a journal: the ops up to the first torn/corrupt line
+    (crash mid-append) and the byte length of that valid prefix.
+    """
+    ops = []
+    end = 0
+    while end < len(data):
+        nl = data.find(b"\n", end)
+        if nl < 0:
+            break
+        line = data[end:nl]
+        if line:
+            crc, _, payload = line.partition(b" ")
+            try:
+                if int(crc, 16) != zlib.crc32(payload):
+                    break
+                ops.append(json.loads(payload.decode("utf-8")))
+            except ValueError:
+                break
+        end = nl + 1
+    return ops, end
+
+
+def _apply_op(records, index, op):
+    """Apply {"op": "put"|"del", "id": ..., "data": {...}} to the ordered list + id index."""
+    sid = op.get("id")
+    if op.get("op") == "put":
+        data = dict(op.get("data") or {}, id=sid)
+        pos = index.get(sid)
+        if pos is None:
+            index[sid] = len(records)
+            records.append(data)
+        else:
+            records[pos] = data
+    elif op.get("op") == "del" and sid in index:
+        records.pop(index.pop(sid))
+        index.clear()
+        index.update((r["id"], i) for i, r in enumerate(records))
+
+
+class JournalStore:
+    """
+    Snapshot + journal files for one vault. append() cost does not depend on
+    the vault size. Compaction rotates the journal to services.journal.1 under
+    the lock, writes the snapshot in a background thread, then drops .1;
+    recovery replays .1 and the live journal (ops are idempotent).
+    read_only=True never touches the files (for readers running next to the app).
+    """
+
+    # Compact once the journal holds this many records
+    COMPACT_EVERY = 256
+
+    # Everything is in the snapshot; nothing is loaded on demand
+    lazy_fields = ()
+
+    def __init__(self, path, read_only=False):
+        self.path = str(path)
+        self.read_only = read_only
+        self.journal_path = self.path[:-5] + ".journal" if self.path.endswith(".json") else self.path + ".journal"
+        self.rotated_path = self.journal_path + ".1"
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_records = 0
+        self._compacting = None
+
+    def load(self):
+        """Snapshot with the journal(s) replayed. Returns the ordered list of records."""
+        records = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            if not isinstance(records, list):
+                records = []
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError) as e:
+            print(f"[JournalStore] Snapshot unreadable ({e}), replaying journal only")
+            records = []
+            if not self.read_only:
+                try:
+                    os.replace(self.path, self.path + ".corrupt")
+                except OSError:
+                    pass
+        for pos, r in enumerate(records):
+            if not r.get("id"):
+                # Journal ops refer to it; compaction writes it out
+                r["id"] = legacy_service_id(pos, r)
+        index = {r["id"]: i for i, r in enumerate(records)}
+        self._journal_records = 0
+        for path in (self.rotated_path, self.journal_path):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            ops, length = _decode_ops(data)
+            for op in ops:
+                _apply_op(records, index, op)
+            self._journal_records += len(ops)
+            if length < len(data) and not self.read_only:
+                # Cut the torn tail so nothing is ever appended after it
+                print(f"[JournalStore] Dropping torn tail of {path} ({len(data) - length} bytes)")
+                try:
+                    os.truncate(path, length)
+                except OSError as e:
+                    print(f"[JournalStore] Could not truncate {path}: {e}")
+        if os.path.exists(self.rotated_path) and not self.read_only:
+            # An interrupted compaction: finish it in the background
+            self.compact_async(records)
+        return records
+
+    def append(self, ops):
+        """Append ops (one line each) and fsync. Returns True when compaction is due."""
+        if self.read_only:
+            raise OSError(f"{self.path} is opened read-only")
+        data = b"".join(_encode_op(op) for op in ops)
+        with self._lock:
+            if self._journal is None:
+                self._journal = open(self.journal_path, "ab")
+            self._journal.write(data)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._journal_records += len(ops)
+            return self._journal_records >= self.COMPACT_EVERY
+
+    def write(self, ops, records):
+        """Journal ops; compact to `records` (the state after ops) when due."""
+        if self.append(ops):
+            self.compact_async(records)
+
+    def load_lazy(self, service_id):
+        return {}
+
+    def compact_async(self, records):
+        """Rotate the journal and write `records` as the new snapshot in a background thread."""
+        with self._lock:
+            if self._compacting is not None and self._compacting.is_alive():
+                return
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if os.path.exists(self.journal_path):
+                if os.path.exists(self.rotated_path):
+                    # A previous compaction failed: keep its ops, append ours after them
+                    with open(self.journal_path, "rb") as src, open(self.rotated_path, "ab") as dst:
+                        dst.write(src.read())
+                    os.remove(self.journal_path)
+                else:
+                    os.replace(self.journal_path, self.rotated_path)
+            self._journal_records = 0
+            snapshot = [dict(r) for r in records]
+            self._compacting = threading.Thread(target=self._compact, args=(snapshot,), daemon=True)
+            self._compacting.start()
+
+    def _compact(self, snapshot):
+        try:
+            _fsync_write(self.path, json.dumps(snapshot, ensure_ascii=False, indent=2).encode("utf-8"))
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[JournalStore] Compaction failed: {e}")
+
+    def write_snapshot(self, records):
+        """Synchronously replace the snapshot and clear both journals."""
+        self.wait()
+        with self._lock:
+            _fsync_write(self.path, json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8"))
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            for path in (self.journal_path, self.rotated_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._journal_records = 0
+
+    def wait(self):
+        """Block until a running compaction has finished."""
+        thread = self._compacting
+        if thread is not None:
+            thread.join()
+
+    def close(self):
+        self.wait()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+class SaveQueue:
+    """
+    Write-behind saver. put() only records the op; a background thread waits
+    until mutations pause for DEBOUNCE seconds (at most MAX_DELAY after the
+    first one) and hands the whole burst to store.write() in one call — one
+    journal append + fsync, or one SQLite transaction. Ops for the same
+    service id are coalesced (last one wins, first position kept).
+    """
+
+    DEBOUNCE = 0.5
+    MAX_DELAY = 2.0
+    # After a failed write (e.g. disk full) the next try waits 1, 2, 4 ... s, up to this
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(self, store, snapshot):
+        self.store = store
+        self._snapshot = snapshot  # callable -> records list after all queued ops
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._ops = {}  # id -> op, insertion-ordered
+        self._inflight = {}  # id -> op taken off the queue, not yet written
+        self._first = self._last = 0.0
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return bool(self._ops)
+
+    def put(self, op):
+        with self._cond:
+            now = time.monotonic()
+            if not self._ops:
+                self._first = now
+            self._last = now
+            self._ops[op["id"]] = op
+            self._cond.notify()
+
+    def latest(self, service_id):
+        """The newest op for `service_id` not yet in the store, or None."""
+        with self._cond:
+            return self._ops.get(service_id) or self._inflight.get(service_id)
+
+    def _write_pending(self):
+        """
+        Take the queued ops and write them. Taking and writing happen under
+        _write_lock, so batches reach the store in the order they were taken
+        (an older batch can never land after a newer one for the same id).
+        Returns True if anything was written.
+        """
+        with self._write_lock:
+            with self._cond:
+                if not self._ops:
+                    return False
+                self._inflight, self._ops = self._ops, {}
+                ops, records = list(self._inflight.values()), self._snapshot()
+            try:
+                self.store.write(ops, records)
+                with self._cond:
+                    self._retry_delay = self._retry_at = 0.0
+            except Exception as e:
+                with self._cond:
+                    self._retry_delay = min(max(1.0, self._retry_delay * 2), self.MAX_RETRY_DELAY)
+                    now = time.monotonic()
+                    self._first = self._last = now
+                    self._retry_at = now + self._retry_delay
+                    # Retry later; newer ops for the same id win
+                    failed = dict(self._inflight)
+                    failed.update(self._ops)
+                    self._ops = failed
+                print(f"[SaveQueue] Error saving services: {e} (retry in {self._retry_delay:.0f}s)")
+            finally:
+                with self._cond:
+                    self._inflight = {}
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._ops and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                while not self._closed:
+                    due = min(self._last + self.DEBOUNCE, self._first + self.MAX_DELAY)
+                    due = max(due, self._retry_at)
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+            self._write_pending()
+
+    def flush(self):
+        """Write pending ops now (on the calling thread). Returns True if anything was written."""
+        return self._write_pending()
+
+    def close(self):
+        """Stop the thread and flush only if something is pending."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+
+class Vault:
+    """
+    Ordered list of service records (dicts with a stable "id") plus the store
+    that persists each mutation. `services` is the live list; mutate it only
+    through add/update/delete. With a store that has lazy_fields, list records
+    lack those fields — use get_full() where they are needed.
+    write_behind=True queues mutations on a SaveQueue instead of writing
+    them on the caller's thread.
+    """
+
+    def __init__(self, store, write_behind=False):
+        self.store = store
+        self.services = store.load()
+        self._index = {s["id"]: i for i, s in enumerate(self.services)}
+        self._queue = SaveQueue(store, lambda: list(self.services)) if write_behind else None
+
+    def _reindex(self):
+        self._index = {s["id"]: i for i, s in enumerate(self.services)}
+
+    def _commit(self, op):
+        if self._queue is not None:
+            self._queue.put(op)
+            return
+        try:
+            self.store.write([op], self.services)
+        except Exception as e:
+            print(f"[Authenticator] Error saving services: {e}")
+
+    def _list_record(self, service_id, data):
+        lazy = self.store.lazy_fields
+        record = {k: v for k, v in data.items() if k not in lazy}
+        record["id"] = service_id
+        return record
+
+    def get(self, service_id):
+        pos = self._index.get(service_id)
+        return None if pos is None else self.services[pos]
+
+    def get_full(self, service_id):
+        """Record including lazily loaded fields (url, backup_codes)."""
+        record = self.get(service_id)
+        if record is None:
+            return None
+        if not self.store.lazy_fields:
+            return record
+        op = self._queue.latest(service_id) if self._queue is not None else None
+        if op is not None and op["op"] == "put":
+            # Saved but still queued: the store has older lazy fields (or none)
+            data = op.get("data") or {}
+            return dict(record, **{f: data.get(f, "") for f in self.store.lazy_fields})
+        return dict(record, **self.store.load_lazy(service_id))
+
+    def __len__(self):
+        return len(self.services)
+
+    def index_of(self, service_id):
+        return self._index.get(service_id, -1)
+
+    def add(self, data):
+        """Append a new service; returns its id."""
+        sid = new_service_id()
+        data = {k: v for k, v in data.items() if k != "id"}
+        self._index[sid] = len(self.services)
+        self.services.append(self._list_record(sid, data))
+        self._commit({"op": "put", "id": sid, "data": data})
+        return sid
+
+    def update(self, service_id, data):
+        pos = self._index.get(service_id)
+        if pos is None:
+            return False
+        data = {k: v for k, v in data.items() if k != "id"}
+        self.services[pos] = self._list_record(service_id, data)
+        self._commit({"op": "put", "id": service_id, "data": data})
+        return True
+
+    def delete(self, service_id):
+        """Remove a service; returns the removed record or None."""
+        pos = self._index.get(service_id)
+        if pos is None:
+            return None
+        removed = self.services.pop(pos)
+        self._reindex()
+        self._commit({"op": "del", "id": service_id})
+        return removed
+
+    def replace_all(self, records):
+        """Replace the whole vault (bulk import / legacy save_services)."""
+        records = [dict(r, id=r.get("id") or new_service_id()) for r in records]
+        keep = {r["id"] for r in records}
+        ops = [{"op": "del", "id": s["id"]} for s in self.services if s["id"] not in keep]
+        ops += [{"op": "put", "id": r["id"], "data": {k: v for k, v in r.items() if k != "id"}} for r in records]
+        self.flush()
+        self.services[:] = [self._list_record(r["id"], r) for r in records]
+        self._reindex()
+        if isinstance(self.store, JournalStore):
+            self.store.write_snapshot(records)
+        else:
+            self.store.write(ops, self.services)
+
+    @property
+    def dirty(self):
+        return self._queue is not None and self._queue.pending
+
+    def flush(self):
+        """Write queued mutations now (no-op without write-behind or when clean)."""
+        return self._queue.flush() if self._queue is not None else False
+
+    def close(self):
+        if self._queue is not None:
+            self._queue.close()
+        self.store.close()
+
+
+def open_vault(data_file, backend=None, write_behind=False, read_only=False):
+    """
+    Open the vault for services.json at `data_file`.
+    backend: "json" (snapshot + journal), "sqlite" (services.db next to it,
+    migrating services.json on first use) or None = sqlite if services.db
+    already exists, else json. write_behind: see Vault. read_only: load
+    without writing anything (no id assignment, compaction or migration).
+    """
+    data_file = str(data_file)
+    db_path = os.path.join(os.path.dirname(data_file), "services.db")
+    json_store = JournalStore(data_file, read_only)
+    if backend is None:
+        backend = "sqlite" if os.path.exists(db_path) else "json"
+    if backend == "sqlite":
+        from authcore.sqlite_store import SQLiteStore
+        if read_only and not SQLiteStore.is_complete(db_path) and os.path.exists(data_file):
+            # Import into services.db never finished (it happens on the next writable open):
+            # services.json is still the complete copy
+            return Vault(json_store, write_behind)
+        return Vault(SQLiteStore(db_path, migrate_from=json_store, read_only=read_only), write_behind)
+    if backend != "json":
+        raise ValueError(f"unknown vault backend: {backend}")
+    return Vault(json_store, write_behind)
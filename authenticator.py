@@ -5,17 +5,22 @@ Can be compiled to APK via Buildozer.
 """
 
 import os
-import json
 import time
-import struct
-import socket
+# Process start, for the cold start report (AuthenticatorApp._report_startup)
+_T_START = time.perf_counter()
 import threading
 import tempfile
-import urllib.parse
-import numpy as np
-import pyotp
+from collections import OrderedDict, deque
+from authcore.clock import COUNTS_SUSPEND as CLOCK_COUNTS_SUSPEND, CorrectedClock
+from authcore.clocksync import OFFSETS_FILE, ClockSync
+from authcore.otpauth import SCHEME as OTPAUTH_SCHEME, parse_otpauth
+from authcore.qrscan import DecodeCascade, DecodeWorker, FrameIngest, QRDecoder, camera_stages
+# numpy / PIL / OpenCV / pyzbar are imported on first use (QR scanning only)
+from authcore.imaging import Image as _PILImage, ImageOps, cv2, np, write_solid_png
+from authcore.totp import BOUNDARY_SLACK, TOTPEngine, decode_secret, format_code, otp_params
+from authcore.storage import VAULT_BACKEND, get_data_file, set_data_dir
+from authcore.vault import open_vault
 from kivy.core.clipboard import Clipboard
-from pathlib import Path
 
 # Disable multitouch emulation (red dots on right/middle click) — desktop only
 from kivy.config import Config
@@ -26,8 +31,10 @@ if _plat not in ('android', 'ios'):
 from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.metrics import dp
-from kivy.properties import StringProperty, NumericProperty
+from kivy.event import EventDispatcher
+from kivy.properties import StringProperty, NumericProperty, ObjectProperty
 from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.lang import Builder
 
 from kivymd.app import MDApp
@@ -90,10 +97,13 @@ def t(en: str, ru: str) -> str:
     """Return Russian string if system locale is Russian, else English."""
     return ru if _is_russian() else en
 
-# ── White background image for bubble menu ──
-from PIL import Image as _PILImage
-
 # ── QR scan dependencies (pyzbar or opencv fallback) ──
+# Детекторы, сканеры zbar, ядро морфологии и буферы — общие для камеры и фото, живут всё время работы
+_qr_decoder = QRDecoder()
+# Стадии распознавания кадра камеры (см. camera_stages); порядок — начальный, дальше его подстраивает DecodeCascade
+_QR_CAMERA_STAGES = ("flip/qween", "flip/raw", "plain/qween", "plain/raw")
+
+
 def _decode_qr_from_path(path):
     """Decode QR from image path with preprocessing. Supports content:// URIs on Android."""
     if not path or not isinstance(path, str):
@@ -179,72 +189,45 @@ def _decode_qr_from_path(path):
         return None
 
     try:
-        # Метод 1: OpenCV
+        # Метод 1: OpenCV — пирамида: сначала уменьшенное изображение, найденный код вырезается из полного
         try:
-            import cv2
             print(f"[_decode_qr_from_path] Trying OpenCV, path: {path}")
-            img = cv2.imread(path)
-            if img is None:
+            t0 = time.perf_counter()
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
                 print(f"[_decode_qr_from_path] OpenCV: Failed to read image")
                 return None
 
-            print(f"[_decode_qr_from_path] OpenCV: Image shape: {img.shape}")
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            gray = cv2.equalizeHist(gray)
-            gray = cv2.GaussianBlur(gray, (3, 3), 0)
-
-            detector = cv2.QRCodeDetector()
-            data, points, _ = detector.detectAndDecode(gray)
+            print(f"[_decode_qr_from_path] OpenCV: Image shape: {gray.shape}")
+            data = _qr_decoder.decode_still(gray)
+            elapsed = (time.perf_counter() - t0) * 1e3
             if data:
-                print(f"[_decode_qr_from_path] OpenCV: Found QR code: {data[:50]}...")
+                print(f"[_decode_qr_from_path] OpenCV: Found QR code in {elapsed:.0f} ms: {data[:50]}...")
                 return data
-            else:
-                print(f"[_decode_qr_from_path] OpenCV: No QR code found, trying rotations...")
-
-            # Попробовать повёрнутые варианты (важно для Android)
-            for rot_name, rot in [("90°", cv2.ROTATE_90_CLOCKWISE), ("-90°", cv2.ROTATE_90_COUNTERCLOCKWISE), ("180°", cv2.ROTATE_180)]:
-                img_rot = cv2.rotate(img, rot)
-                gray = cv2.cvtColor(img_rot, cv2.COLOR_BGR2GRAY)
-                gray = cv2.equalizeHist(gray)
-                data, _, _ = detector.detectAndDecode(gray)
-                if data:
-                    print(f"[_decode_qr_from_path] OpenCV: Found QR code at {rot_name}: {data[:50]}...")
-                    return data
-            print(f"[_decode_qr_from_path] OpenCV: No QR code found in any rotation")
+            print(f"[_decode_qr_from_path] OpenCV: No QR code found ({elapsed:.0f} ms)")
 
         except Exception as cv_err:
             print(f"[_decode_qr_from_path] OpenCV error: {cv_err}")
 
         # Метод 2: pyzbar
         try:
-            from pyzbar import pyzbar
-            from PIL import ImageOps
             print(f"[_decode_qr_from_path] Trying pyzbar, path: {path}")
             img = _PILImage.open(path)
             print(f"[_decode_qr_from_path] PIL: Image size: {img.size}, mode: {img.mode}")
             img = ImageOps.exif_transpose(img)  # важно для фото с Android
-            img = img.convert("RGB")
+            img = img.convert("L")
             print(f"[_decode_qr_from_path] PIL: After conversion - size: {img.size}, mode: {img.mode}")
-            
+
             try:
-                decoded = pyzbar.decode(img)
-                print(f"[_decode_qr_from_path] pyzbar.decode: Found {len(decoded) if decoded else 0} codes")
-                if decoded:
-                    data = decoded[0].data.decode("utf-8", errors="ignore")
+                # Сканер zbar настроен только на QR и переиспользуется между вызовами
+                data = _qr_decoder.zbar(np.asarray(img))
+                if data:
                     print(f"[_decode_qr_from_path] pyzbar: Found QR code: {data[:50]}...")
                     return data
+                print(f"[_decode_qr_from_path] pyzbar: No QR code found")
             except Exception as pyzbar_err:
                 # Перехватываем ошибки pyzbar (ctypes.ArgumentError и т.д.)
-                print(f"[_decode_qr_from_path] pyzbar.decode error: {pyzbar_err}")
-                # Пробуем с явным указанием symbols
-                try:
-                    decoded = pyzbar.decode(img, symbols=[pyzbar.ZBarSymbol.QRCODE])
-                    if decoded:
-                        data = decoded[0].data.decode("utf-8", errors="ignore")
-                        print(f"[_decode_qr_from_path] pyzbar (with symbols): Found QR code: {data[:50]}...")
-                        return data
-                except Exception as pyzbar_err2:
-                    print(f"[_decode_qr_from_path] pyzbar.decode (with symbols) error: {pyzbar_err2}")
+                print(f"[_decode_qr_from_path] pyzbar error: {pyzbar_err}")
         except Exception as e:
             print(f"[_decode_qr_from_path] PIL/pyzbar import/processing error: {e}")
             import traceback
@@ -290,79 +273,6 @@ def _patch_zbarcam():
 # Патч будет применен при первом вызове start_zbarcam
 
 
-def _decode_qr_from_frame(frame_bgr):
-    """Decode QR from numpy array (BGR)."""
-    try:
-        import cv2
-        detector = cv2.QRCodeDetector()
-        data, _, _ = detector.detectAndDecode(frame_bgr)
-        if data:
-            return data
-    except Exception:
-        pass
-
-    try:
-        import cv2
-        from pyzbar import pyzbar
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        img = _PILImage.fromarray(frame_rgb)
-        decoded = pyzbar.decode(img)
-        if decoded:
-            return decoded[0].data.decode("utf-8", errors="ignore")
-    except Exception:
-        pass
-
-    return None
-
-
-def _decode_qr_qween(frame_bgr):
-    """
-    Распознавание QR — пайплайн qweenQR. На Android пробуем повороты кадра (камера ROTATION_90).
-    frame_bgr: numpy array BGR. Возвращает строку или None.
-    """
-    import cv2
-    from pyzbar.pyzbar import decode
-
-    def _run_qween(f):
-        """Один проход: qweenQR предобработка + decode(binary), иначе decode(f)."""
-        try:
-            gray = cv2.cvtColor(f, cv2.COLOR_BGR2GRAY)
-            gray = cv2.multiply(gray, 0.6)
-            gray = np.clip(gray, 0, 255).astype(np.uint8)
-            binary = cv2.adaptiveThreshold(
-                gray, 255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY,
-                11, 2
-            )
-            kernel = np.ones((3, 3), np.uint8)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-            binary = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-            binary = cv2.GaussianBlur(binary, (5, 5), 0)
-            qr_codes = decode(binary)
-            if not qr_codes:
-                qr_codes = decode(f)
-            if qr_codes:
-                return qr_codes[0].data.decode("utf-8", errors="ignore")
-        except Exception:
-            pass
-        return None
-
-    try:
-        # На Android текстура часто перевёрнута (OpenGL) — сначала flip, затем оригинал
-        out = _run_qween(cv2.flip(frame_bgr, 0))
-        if out:
-            return out
-        out = _run_qween(frame_bgr)
-        if out:
-            return out
-    except Exception as e:
-        if not getattr(_decode_qr_qween, "_logged_err", False):
-            _decode_qr_qween._logged_err = True
-            print(f"[Authenticator] _decode_qr_qween error: {e}")
-    return None
-
-
 def _take_picture_android(on_complete):
     """
     Launch Android camera. On API 29+ uses MediaStore to get content URI and EXTRA_OUTPUT
@@ -514,29 +424,68 @@ def _has_qr_decoder():
     """Check if QR decoder is available. On Android we allow scan anyway (decode tried on photo)."""
     if platform == "android":
         return True  # opencv is in build; decode will be tried when photo is taken
-    try:
-        from pyzbar import pyzbar
+    if _qr_decoder.has_zbar:
         return True
-    except ImportError:
-        pass
     try:
-        import cv2
-        _ = cv2.QRCodeDetector()
+        _qr_decoder.detector()
         return True
     except Exception:
         pass
     return False
-_white_bg = os.path.join(tempfile.gettempdir(), '_kivy_white_bg.png').replace('\\', '/')
-if not os.path.exists(_white_bg):
-    _PILImage.new('RGBA', (4, 4), (247, 247, 247, 255)).save(_white_bg)
-
-# ── Override bubble menu style via KV (no Python monkey-patching) ─────
-_cut = t("Cut", "Вырезать")
-_copy = t("Copy", "Копировать")
-_paste = t("Paste", "Вставить")
-_selectall = t("Select all", "Выбрать всё")
-from kivy.lang import Builder
-Builder.load_string(f'''
+
+
+# ── Position bubble above the text field (safe: only moves the widget) ──
+from kivy.uix.textinput import TextInput
+_orig_show_ccp = TextInput._show_cut_copy_paste
+
+def _positioned_show_ccp(self, pos, win, parent_changed=False, mode='',
+                         pos_in_window=False, *l):
+    _orig_show_ccp(self, pos, win, parent_changed, mode, pos_in_window, *l)
+    bubble = self._bubble
+    if bubble is None or parent_changed:
+        return
+    t_pos = self.to_window(pos[0], pos[1]) if not pos_in_window else pos
+    bw = bubble.size[0]
+    bx = t_pos[0] - bw / 2
+    bx = max(dp(4), min(bx, win.width - bw - dp(4)))
+    field_top_y = self.to_window(0, self.top)[1]
+    by = field_top_y + dp(8)
+    if by + bubble.height > win.height:
+        field_bottom_y = self.to_window(0, self.y)[1]
+        by = field_bottom_y - bubble.height - dp(8)
+    bubble_pos = self.to_widget(bx, by, relative=True)
+    bubble.center_x = bubble_pos[0] + bw / 2
+    bubble.y = bubble_pos[1]
+    bubble.arrow_pos = 'bottom_mid'
+
+
+# ── TextInput bubble menu (Cut/Copy/Paste): style + position ─────────
+_text_input_ready = False
+
+
+def _white_bg_image(data_dir):
+    """4x4 light PNG used as bubble background; written once into the app data dir."""
+    path = os.path.join(data_dir, "white_bg.png")
+    if not os.path.exists(path):
+        try:
+            write_solid_png(path, (247, 247, 247, 255))
+        except OSError as e:
+            print(f"[Authenticator] Cannot write {path}: {e}")
+    return path.replace('\\', '/')
+
+
+def _setup_text_input(data_dir):
+    """Override bubble menu style via KV and position it; called once from App.build()."""
+    global _text_input_ready
+    if _text_input_ready:
+        return
+    _text_input_ready = True
+    _white_bg = _white_bg_image(data_dir)
+    _cut = t("Cut", "Вырезать")
+    _copy = t("Copy", "Копировать")
+    _paste = t("Paste", "Вставить")
+    _selectall = t("Select all", "Выбрать всё")
+    Builder.load_string(f'''
 <-TextInputCutCopyPaste>:
     content: content.__self__
     but_cut: cut.__self__
@@ -585,248 +534,418 @@ Builder.load_string(f'''
             background_color: 0.97, 0.97, 0.97, 1
             color: 0.1, 0.1, 0.1, 1
 ''')
+    TextInput._show_cut_copy_paste = _positioned_show_ccp
 
-# ── Position bubble above the text field (safe: only moves the widget) ──
-from kivy.uix.textinput import TextInput
-_orig_show_ccp = TextInput._show_cut_copy_paste
-
-def _positioned_show_ccp(self, pos, win, parent_changed=False, mode='',
-                         pos_in_window=False, *l):
-    _orig_show_ccp(self, pos, win, parent_changed, mode, pos_in_window, *l)
-    bubble = self._bubble
-    if bubble is None or parent_changed:
-        return
-    t_pos = self.to_window(pos[0], pos[1]) if not pos_in_window else pos
-    bw = bubble.size[0]
-    bx = t_pos[0] - bw / 2
-    bx = max(dp(4), min(bx, win.width - bw - dp(4)))
-    field_top_y = self.to_window(0, self.top)[1]
-    by = field_top_y + dp(8)
-    if by + bubble.height > win.height:
-        field_bottom_y = self.to_window(0, self.y)[1]
-        by = field_bottom_y - bubble.height - dp(8)
-    bubble_pos = self.to_widget(bx, by, relative=True)
-    bubble.center_x = bubble_pos[0] + bw / 2
-    bubble.y = bubble_pos[1]
-    bubble.arrow_pos = 'bottom_mid'
-
-TextInput._show_cut_copy_paste = _positioned_show_ccp
 
+class _ToastPresenter:
+    """
+    One long-lived toast (ModalView + Label) fed by a message queue, instead of a
+    new modal per call. The message on screen repeated just stays longer, queued
+    duplicates are merged, and when others are waiting the current one is cut
+    short to MIN_VISIBLE; the oldest waiting messages are dropped past MAX_QUEUE.
+    Measured sizes are cached per (text, wrap width).
+    """
 
-def toast(text, duration=2.5):
-    """Custom toast with text wrapping support. Fade in/out, no slide."""
-    from kivy.uix.boxlayout import BoxLayout as _BL
-    from kivy.graphics import Color, RoundedRectangle
-
-    # Pre-calculate size using a temporary label
-    label = Label(
-        text=text,
-        font_size=dp(14),
-        color=(1, 1, 1, 1),
-        halign="center",
-        valign="middle",
-        size_hint=(None, None),
-        padding=(dp(20), dp(12)),
-    )
-    label.text_size = (min(dp(350), Window.width - dp(60)), None)
-    label.texture_update()
-    w = min(label.texture_size[0] + dp(40), Window.width - dp(40))
-    h = label.texture_size[1] + dp(24)
-    label.size = (w, h)
-
-    container = _BL(padding=0, size_hint=(None, None), size=(w, h))
-    with container.canvas.before:
-        Color(0.2, 0.2, 0.2, 0.92)
-        bg = RoundedRectangle(pos=container.pos, size=container.size, radius=[dp(8)])
-    container.bind(pos=lambda *a: setattr(bg, 'pos', container.pos))
-    container.bind(size=lambda *a: setattr(bg, 'size', container.size))
-    container.add_widget(label)
-
-    # Use ModalView with NO open/close animation
-    view = ModalView(
-        size_hint=(None, None),
-        size=(w, h),
-        background_color=(0, 0, 0, 0),
-        overlay_color=(0, 0, 0, 0),
-        auto_dismiss=True,
-        pos_hint={"center_x": 0.5, "y": 0.05},
-    )
-    view.add_widget(container)
-
-    # Disable default ModalView slide animation
-    view.opacity = 0
-    view.open(animation=False)
-
-    # Fade in
-    anim_in = Animation(opacity=1, duration=0.2)
-    anim_in.start(view)
-
-    # Schedule fade out + dismiss
-    def _fade_out(dt):
+    MAX_QUEUE = 3
+    MIN_VISIBLE = 0.8
+    SIZE_CACHE = 64
+
+    def __init__(self):
+        self._view = None
+        self._container = None
+        self._label = None
+        self._queue = deque()  # (text, duration)
+        self._current = None
+        self._shown_at = 0.0
+        self._hide_at = 0.0
+        self._hide_event = None
+        self._sizes = OrderedDict()
+
+    def _build(self):
+        from kivy.graphics import Color, RoundedRectangle
+
+        self._label = Label(
+            font_size=dp(14),
+            color=(1, 1, 1, 1),
+            halign="center",
+            valign="middle",
+            size_hint=(None, None),
+            padding=(dp(20), dp(12)),
+        )
+        container = self._container = BoxLayout(padding=0, size_hint=(None, None))
+        with container.canvas.before:
+            Color(0.2, 0.2, 0.2, 0.92)
+            bg = RoundedRectangle(pos=container.pos, size=container.size, radius=[dp(8)])
+        container.bind(pos=lambda *a: setattr(bg, 'pos', container.pos))
+        container.bind(size=lambda *a: setattr(bg, 'size', container.size))
+        container.add_widget(self._label)
+
+        # ModalView with NO open/close animation
+        self._view = ModalView(
+            size_hint=(None, None),
+            background_color=(0, 0, 0, 0),
+            overlay_color=(0, 0, 0, 0),
+            auto_dismiss=True,
+            pos_hint={"center_x": 0.5, "y": 0.05},
+        )
+        self._view.add_widget(container)
+        self._view.bind(on_dismiss=self._on_dismiss)
+
+    def _measure(self, text, wrap):
+        key = (text, wrap)
+        size = self._sizes.get(key)
+        if size is not None:
+            self._sizes.move_to_end(key)
+            return size
+        self._label.text = text
+        self._label.texture_update()
+        w = min(self._label.texture_size[0] + dp(40), Window.width - dp(40))
+        h = self._label.texture_size[1] + dp(24)
+        size = self._sizes[key] = (w, h)
+        if len(self._sizes) > self.SIZE_CACHE:
+            self._sizes.popitem(last=False)
+        return size
+
+    def show(self, text, duration=2.5):
+        if self._current is not None and self._current == text:
+            self._schedule_hide(duration)
+            return
+        for i, (queued, _d) in enumerate(self._queue):
+            if queued == text:
+                self._queue[i] = (text, duration)
+                return
+        self._queue.append((text, duration))
+        while len(self._queue) > self.MAX_QUEUE:
+            self._queue.popleft()
+        if self._current is None:
+            self._next()
+        else:
+            delay = max(self.MIN_VISIBLE - (time.monotonic() - self._shown_at), 0)
+            if time.monotonic() + delay < self._hide_at:
+                self._schedule_hide(delay)
+
+    def _next(self):
+        text, duration = self._queue.popleft()
+        if self._view is None:
+            self._build()
+        wrap = min(dp(350), Window.width - dp(60))
+        self._label.text_size = (wrap, None)
+        w, h = self._measure(text, wrap)
+        self._label.text = text
+        self._label.size = self._container.size = self._view.size = (w, h)
+        self._current = text
+        self._shown_at = time.monotonic()
+
+        view = self._view
+        Animation.cancel_all(view)
+        if view.parent is None:
+            view.opacity = 0
+            view.open(animation=False)
+            Animation(opacity=1, duration=0.2).start(view)
+        else:
+            # Already on screen (or fading out): just swap the text
+            view.opacity = 1
+        self._schedule_hide(duration)
+
+    def _schedule_hide(self, delay):
+        if self._hide_event is not None:
+            self._hide_event.cancel()
+        self._hide_at = time.monotonic() + delay
+        self._hide_event = Clock.schedule_once(self._advance, delay)
+
+    def _advance(self, dt):
+        self._hide_event = None
+        if self._queue:
+            self._next()
+            return
+        self._current = None
+        view = self._view
         anim_out = Animation(opacity=0, duration=0.3)
         anim_out.bind(on_complete=lambda *a: view.dismiss(animation=False))
         anim_out.start(view)
 
-    Clock.schedule_once(_fade_out, duration)
+    def _on_dismiss(self, *args):
+        # Tapped away (or faded out): drop whatever was still waiting
+        if self._hide_event is not None:
+            self._hide_event.cancel()
+            self._hide_event = None
+        self._queue.clear()
+        self._current = None
 
-# ── Data file path ───────────────────────────────────────────────────
-# Will be set properly in AuthenticatorApp.build() for Android support
-_data_file = None
 
+_toast_presenter = None
 
-def _get_data_file():
-    """Get the data file path, with Android-safe fallback."""
-    global _data_file
-    if _data_file is not None:
-        return _data_file
-    # Fallback for desktop
-    _data_file = Path(os.path.dirname(os.path.abspath(__file__))) / "services.json"
-    return _data_file
 
+def toast(text, duration=2.5):
+    """Custom toast with text wrapping support. Fade in/out, no slide. Messages are queued."""
+    global _toast_presenter
+    if _toast_presenter is None:
+        _toast_presenter = _ToastPresenter()
+    _toast_presenter.show(text, duration)
 
-def set_data_dir(directory):
-    """Set data directory (called from App.build with user_data_dir on Android)."""
-    global _data_file
-    d = Path(directory)
-    d.mkdir(parents=True, exist_ok=True)
-    _data_file = d / "services.json"
+# ── KV Language UI definition ────────────────────────────────────────
+# KV will be built in build() after Android initialization with proper translations
 
 
-def load_services():
-    """Load services list from JSON file."""
-    data_file = _get_data_file()
-    if data_file.exists():
-        try:
-            with open(data_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
-    return []
+class TickGroup(EventDispatcher):
+    """Countdown shared by every card with the same period, driven by one Animation."""
 
+    period = NumericProperty(30)
+    seconds = NumericProperty(30)
+    progress = NumericProperty(100)
 
-def save_services(services):
-    """Save services list to JSON file."""
-    data_file = _get_data_file()
-    try:
-        data_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(data_file, "w", encoding="utf-8") as f:
-            json.dump(services, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"[Authenticator] Error saving services: {e}")
+    # Redraw the bar 4x per second instead of every frame
+    ANIM_STEP = 0.25
+
+    def restart(self, remaining):
+        """Jump to `remaining` seconds and animate linearly down to zero."""
+        Animation.cancel_all(self)
+        self.seconds = remaining
+        self.progress = (remaining / self.period) * 100
+        Animation(seconds=0, progress=0, duration=remaining, step=self.ANIM_STEP).start(self)
 
+    def stop(self):
+        Animation.cancel_all(self)
 
-def check_ntp_offset(callback, timeout=5):
+
+class CodeScheduler:
     """
-    Check system clock offset against NTP server in a background thread.
-    Calls callback(offset_seconds) on completion, or callback(None) on failure.
-    Uses raw NTP packet (no external dependencies).
+    Wakes up only at the next period boundary of any period group (no 1 s polling).
+    At a boundary the engine recomputes only the groups that rolled over and only
+    their on-screen cards are redrawn, so a 60 s group does not tick at the 30 s rate.
+    The countdown in between is a single TickGroup animation per period.
+    Shortly before each boundary the next window's codes are precomputed in a
+    background thread, so the rollover itself is a dict swap on the UI thread.
+    While the main screen is not shown (set_visible(False)) or the app is in the
+    background (suspend()) nothing is scheduled or animated at all; becoming
+    active again does one catch-up resync.
     """
-    def _worker():
-        NTP_SERVERS = [
-            "pool.ntp.org",
-            "time.google.com",
-            "time.windows.com",
-            "time.cloudflare.com",
-        ]
-        NTP_EPOCH = 2208988800  # seconds between 1900-01-01 and 1970-01-01
-
-        for server in NTP_SERVERS:
-            try:
-                # Build NTP request packet (48 bytes, version 3, client mode)
-                packet = b'\x1b' + 47 * b'\0'
 
-                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                sock.settimeout(timeout)
-                sock.sendto(packet, (server, 123))
+    # Seconds before a boundary to start precomputing the next window
+    LOOKAHEAD = 2.0
+
+    def __init__(self, engine, clock):
+        self.engine = engine
+        self.clock = clock
+        self._groups = {}  # period -> TickGroup
+        self._counters = {}  # period -> window counter last drawn
+        # Recycled card views; only the ones attached to the list are redrawn
+        self._views = set()
+        self._visible = True
+        self._suspended = False
+        self._event = None
+        self._lookahead_event = None
+
+    def set_periods(self, periods):
+        """Keep one TickGroup per period in use and restart all countdowns."""
+        periods = set(periods)
+        for period in list(self._groups):
+            if period not in periods:
+                self._groups.pop(period).stop()
+                self._counters.pop(period, None)
+        now = self.clock()
+        for period in periods:
+            group = self._groups.get(period)
+            if group is None:
+                group = self._groups[period] = TickGroup(period=period)
+            if self._active:
+                group.restart(self.engine.remaining(now, period))
+                self._counters[period] = int(now // period)
+        self._schedule(now)
+
+    def group(self, period):
+        return self._groups.get(period)
+
+    def periods(self):
+        return list(self._groups)
+
+    def attach(self, view):
+        """Register a card view (called when RecycleView binds it to a service)."""
+        self._views.add(view)
+
+    @property
+    def _active(self):
+        return self._visible and not self._suspended
+
+    def _set_state(self, visible, suspended):
+        was_active = self._active
+        self._visible, self._suspended = visible, suspended
+        if self._active == was_active:
+            return
+        if self._active:
+            self.resync()
+        else:
+            self.stop()
 
-                local_send = time.time()
-                data, _ = sock.recvfrom(1024)
-                local_recv = time.time()
-                sock.close()
+    def set_visible(self, visible):
+        """Main list shown/hidden (screen change): stop everything or catch up once."""
+        self._set_state(visible, self._suspended)
 
-                if len(data) < 48:
-                    continue
+    def suspend(self):
+        """App went to the background."""
+        self._set_state(self._visible, True)
 
-                # Extract transmit timestamp (bytes 40-47)
-                ntp_time = struct.unpack('!I', data[40:44])[0] - NTP_EPOCH
-                ntp_fraction = struct.unpack('!I', data[44:48])[0] / (2**32)
-                ntp_timestamp = ntp_time + ntp_fraction
+    def resume(self):
+        """App is back: one recompute against the corrected clock."""
+        self._set_state(self._visible, False)
 
-                # Calculate offset (simplified: assume symmetric delay)
-                local_mid = (local_send + local_recv) / 2
-                offset = ntp_timestamp - local_mid
-
-                callback(offset)
-                return
-            except (socket.error, OSError, struct.error):
+    def _schedule(self, now):
+        self._cancel_events()
+        if not self._groups or not self._active:
+            return
+        delay = min(self.engine.remaining(now, p) for p in self._groups)
+        self._event = Clock.schedule_once(self._on_boundary, delay + BOUNDARY_SLACK)
+        if delay > self.LOOKAHEAD:
+            self._lookahead_event = Clock.schedule_once(self._start_lookahead, delay - self.LOOKAHEAD)
+
+    def _start_lookahead(self, dt):
+        self._lookahead_event = None
+        # Only the groups rolling over next; twice the lookahead leaves room for timer jitter
+        threading.Thread(target=self.engine.prepare_next, kwargs={"within": 2 * self.LOOKAHEAD}, daemon=True).start()
+
+    def _cancel_events(self):
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        if self._lookahead_event is not None:
+            self._lookahead_event.cancel()
+            self._lookahead_event = None
+
+    def _on_boundary(self, dt, force=False):
+        self._event = None
+        if not self._active:
+            return
+        now = self.clock()
+        self.engine.refresh(now)
+        rolled = set()
+        for period, group in self._groups.items():
+            counter = int(now // period)
+            if counter == self._counters.get(period) and not force:
                 continue
+            self._counters[period] = counter
+            group.restart(self.engine.remaining(now, period))
+            rolled.add(period)
+        if rolled:
+            for view in self._views:
+                # Detached views refresh themselves when re-attached (ServiceCard.on_parent)
+                if view.parent is not None and view.period in rolled:
+                    view._update_code()
+        self._schedule(now)
+
+    def resync(self):
+        """Corrected time moved (new NTP offset or clock jump): redraw and re-arm everything."""
+        self._on_boundary(0, force=True)
+
+    def stop(self):
+        self._cancel_events()
+        for group in self._groups.values():
+            group.stop()
+
+
+class LifecycleManager:
+    """
+    Suspends registered background work while the app is paused (Android
+    on_pause, desktop window minimized) and resumes it once when it is back.
+    Hooks run in registration order on pause and in reverse order on resume.
+    """
 
-        callback(None)
+    def __init__(self):
+        self.paused = False
+        self._hooks = []  # (name, suspend, resume)
 
-    thread = threading.Thread(target=_worker, daemon=True)
-    thread.start()
+    def register(self, name, suspend, resume=None):
+        self._hooks.append((name, suspend, resume))
 
+    def pause(self):
+        if self.paused:
+            return
+        self.paused = True
+        for name, suspend, _resume in self._hooks:
+            try:
+                suspend()
+            except Exception as e:
+                print(f"[Lifecycle] {name} suspend error: {e}")
 
-# ── KV Language UI definition ────────────────────────────────────────
-# KV will be built in build() after Android initialization with proper translations
+    def resume(self):
+        if not self.paused:
+            return
+        self.paused = False
+        for name, _suspend, resume in reversed(self._hooks):
+            if resume is None:
+                continue
+            try:
+                resume()
+            except Exception as e:
+                print(f"[Lifecycle] {name} resume error: {e}")
 
 
-class ServiceCard(MDCard):
-    """Card widget displaying a single 2FA service with live TOTP code."""
+class ServiceCard(RecycleDataViewBehavior, MDCard):
+    """
+    Recycled card view for one 2FA service in the main RecycleView.
+    Only the visible rows exist; refresh_view_attrs rebinds a view to another
+    service (data item from AuthenticatorApp._service_row) on scroll.
+    """
 
     title = StringProperty("")
     account = StringProperty("")
     totp_code = StringProperty("------")
-    timer_progress = NumericProperty(100)
-    timer_seconds = NumericProperty(30)
-    service_index = NumericProperty(0)
-
-    def __init__(self, service_data: dict, index: int, **kwargs):
-        super().__init__(**kwargs)
-        self.service_data = service_data
-        self.service_index = index
-        self.title = service_data.get("title", "Unknown")
-        self.account = service_data.get("account", "")
-        self.secret = service_data.get("secret", "")
+    period = NumericProperty(30)
+    tick_group = ObjectProperty(None, allownone=True)
+    service_id = StringProperty("")
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.service_id = data["service_id"]
+        self.title = data["title"]
+        self.account = data["account"]
+        self.period = data["period"]
+        MDApp.get_running_app().code_scheduler.attach(self)
         self._update_code()
+        return super().refresh_view_attrs(rv, index, data)
+
+    def on_parent(self, instance, parent):
+        # RecycleView can re-attach a cached view without rebinding it; codes may be stale
+        if parent is not None and self.service_id:
+            self._update_code()
 
     def _update_code(self, *_args):
-        """Generate current TOTP code and update timer."""
-        try:
-            secret_clean = self.secret.replace(" ", "").upper()
-            totp = pyotp.TOTP(secret_clean)
-            code = totp.now()
-            # Format code as "XXX XXX" for readability
-            self.totp_code = f"{code[:3]} {code[3:]}"
-
-            # Timer: seconds remaining in current 30s window
-            now = time.time()
-            elapsed = now % 30
-            remaining = 30 - elapsed
-            self.timer_seconds = remaining
-            self.timer_progress = (remaining / 30) * 100
-        except Exception:
-            self.totp_code = "ERR KEY"
-            self.timer_progress = 0
-            self.timer_seconds = 0
+        """Show the cached TOTP code from the app engine (timer comes from tick_group)."""
+        app = MDApp.get_running_app()
+        code = app.totp_engine.code(self.service_id)
+        # Format code as "XXX XXX" for readability
+        self.totp_code = "ERR KEY" if code is None else format_code(code)
+        self.tick_group = None if code is None else app.code_scheduler.group(self.period)
+
+    # Warn on copy when the code has fewer seconds left than this
+    EXPIRY_WARNING = 5
 
     def copy_code(self):
-        """Copy current TOTP code to clipboard."""
+        """Copy current TOTP code to clipboard (warn if it is about to expire)."""
         try:
-            code = self.totp_code.replace(" ", "")
+            window = MDApp.get_running_app().totp_engine.code_window(self.service_id)
+            if window is None:
+                return
+            (code, expires), (next_code, _) = window
             Clipboard.copy(code)
-            toast(t("Code copied", "Код скопирован") + f": {self.totp_code}")
+            msg = t("Code copied", "Код скопирован") + f": {format_code(code)}"
+            left = expires - MDApp.get_running_app().clock.now()
+            if left < self.EXPIRY_WARNING:
+                msg += "\n" + t(
+                    "Expires in {0}s, next: {1}", "Истекает через {0}с, следующий: {1}"
+                ).format(max(int(left), 0), format_code(next_code))
+            toast(msg)
         except Exception:
             pass
 
     def edit_service(self):
         """Navigate to edit screen for this service."""
         app = MDApp.get_running_app()
-        app.open_edit_screen(self.service_index)
+        app.open_edit_screen(self.service_id)
 
     def confirm_delete(self):
         """Show confirmation dialog before deleting."""
         app = MDApp.get_running_app()
+        # The view may be recycled for another service while the dialog is open
+        service_id = self.service_id
         self._delete_dialog = MDDialog(
             title=t("Delete Service", "Удалить сервис"),
             text=t('Delete "{0}"? This cannot be undone.', 'Удалить "{0}"? Это нельзя отменить.').format(self.title),
@@ -840,22 +959,29 @@ class ServiceCard(MDCard):
                 MDRaisedButton(
                     text=t("DELETE", "УДАЛИТЬ"),
                     md_bg_color=[0.9, 0.3, 0.3, 1],
-                    on_release=lambda x: self._do_delete(),
+                    on_release=lambda x: self._do_delete(service_id),
                 ),
             ],
         )
         self._delete_dialog.open()
 
-    def _do_delete(self):
-        """Delete this service."""
+    def _do_delete(self, service_id):
+        """Delete the service the dialog was opened for."""
         self._delete_dialog.dismiss()
         app = MDApp.get_running_app()
-        app.delete_service(self.service_index)
+        app.delete_service(service_id)
 
 
 class MainScreen(MDScreen):
     """Main screen showing list of 2FA services."""
 
+    def on_pre_enter(self, *args):
+        # Codes only tick while the list is on screen
+        MDApp.get_running_app().code_scheduler.set_visible(True)
+
+    def on_leave(self, *args):
+        MDApp.get_running_app().code_scheduler.set_visible(False)
+
     def open_add_screen(self):
         app = MDApp.get_running_app()
         app.open_add_screen()
@@ -864,23 +990,26 @@ class MainScreen(MDScreen):
 class AddEditScreen(MDScreen):
     """Screen for adding or editing a service."""
 
-    editing_index = NumericProperty(-1)  # -1 = adding new
+    editing_id = StringProperty("")  # "" = adding new
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._pending_otpauth = ""  # QR код для применения при входе на экран
+        # period/digits/algorithm — from otpauth URI or the edited record (no form fields)
+        self._otp_params = otp_params({})
 
     def on_enter(self):
         """Populate fields if editing existing service."""
-        if self.editing_index >= 0:
+        if self.editing_id:
             app = MDApp.get_running_app()
-            service = app.services[self.editing_index]
+            service = app.vault.get_full(self.editing_id)
             self.ids.toolbar.title = t("Edit Service", "Редактировать сервис")
             self.ids.field_title.text = service.get("title", "")
             self.ids.field_url.text = service.get("url", "")
             self.ids.field_secret.text = service.get("secret", "")
             self.ids.field_account.text = service.get("account", "")
             self.ids.field_backup.text = service.get("backup_codes", "")
+            self._otp_params = otp_params(service)
             self.ids.save_btn.text = t("UPDATE", "ОБНОВИТЬ")
         else:
             self.ids.toolbar.title = t("Add Service", "Добавить сервис")
@@ -898,6 +1027,7 @@ class AddEditScreen(MDScreen):
                 self.ids.field_secret.text = ""
                 self.ids.field_account.text = ""
                 self.ids.field_backup.text = ""
+                self._otp_params = otp_params({})
             self.ids.save_btn.text = t("SAVE", "СОХРАНИТЬ")
 
     def save_service(self):
@@ -919,9 +1049,8 @@ class AddEditScreen(MDScreen):
 
         # Validate secret key
         try:
-            secret_clean = secret.replace(" ", "").upper()
-            pyotp.TOTP(secret_clean).now()
-        except Exception:
+            decode_secret(secret)
+        except ValueError:
             self.ids.field_secret.error = True
             self.ids.field_secret.helper_text = t("Invalid Base32 secret key", "Неверный Base32 секретный ключ")
             self.ids.field_secret.helper_text_mode = "on_error"
@@ -934,18 +1063,22 @@ class AddEditScreen(MDScreen):
             "account": self.ids.field_account.text.strip(),
             "backup_codes": self.ids.field_backup.text.strip(),
         }
+        period, digits, algorithm = self._otp_params
+        service_data.update(period=period, digits=digits, algorithm=algorithm)
 
         app = MDApp.get_running_app()
 
-        if self.editing_index >= 0:
-            app.services[self.editing_index] = service_data
+        if self.editing_id:
+            service_id = self.editing_id
+            old_pos = app.vault.index_of(service_id)
+            app.vault.update(service_id, service_data)
             msg = f'"{title}" ' + t("updated", "обновлено")
         else:
-            app.services.append(service_data)
+            service_id = app.vault.add(service_data)
+            old_pos = -1
             msg = f'"{title}" ' + t("added", "добавлено")
 
-        save_services(app.services)
-        app.refresh_main_screen()
+        app.reconcile_service(service_id, old_pos)
 
         toast(msg)
 
@@ -970,6 +1103,7 @@ class AddEditScreen(MDScreen):
 
         if platform == "android":
             app = MDApp.get_running_app()
+            app.screen("qr_scan")
             app.sm.transition.direction = "left"
             app.sm.current = "qr_scan"
         else:
@@ -1008,25 +1142,17 @@ class AddEditScreen(MDScreen):
         """Parse otpauth:// URI and fill form fields."""
         print(f"[AddEditScreen] _apply_otpauth called with URI: {uri[:100]}...")
         uri = uri.strip()
-        if not uri.lower().startswith("otpauth://"):
+        if not uri.lower().startswith(OTPAUTH_SCHEME):
             print(f"[AddEditScreen] Invalid format, URI doesn't start with otpauth://")
             toast(t("Invalid format (expected otpauth://)", "Неверный формат (ожидается otpauth://)"))
             return
         try:
-            parsed = urllib.parse.urlparse(uri)
-            params = urllib.parse.parse_qs(parsed.query)
-            secret = (params.get("secret", [""]) or [""])[0]
-            issuer = (params.get("issuer", [""]) or [""])[0]
-            label = urllib.parse.unquote((parsed.path or "").lstrip("/").replace("totp/", "").strip())
-            if ":" in label:
-                parts = label.split(":", 1)
-                if not issuer:
-                    issuer = parts[0].strip()
-                account = parts[1].strip() if len(parts) > 1 else ""
-            else:
-                account = label.strip()
+            parsed = parse_otpauth(uri)
+            secret, issuer, account = parsed["secret"], parsed["issuer"], parsed["account"]
+            self._otp_params = (parsed["period"], parsed["digits"], parsed["algorithm"])
             
-            print(f"[AddEditScreen] Parsed - secret: {secret[:20]}..., issuer: {issuer}, account: {account}")
+            print(f"[AddEditScreen] Parsed - secret: {secret[:20]}..., issuer: {issuer}, account: {account}, "
+                  f"period/digits/algorithm: {self._otp_params}")
             
             # Проверяем, что виджеты существуют
             if "field_secret" not in self.ids:
@@ -1042,9 +1168,9 @@ class AddEditScreen(MDScreen):
                 toast(t("Form not ready", "Форма не готова"))
                 return
             
-            self.ids.field_secret.text = secret.replace(" ", "").upper()
+            self.ids.field_secret.text = secret
             self.ids.field_secret.error = False
-            self.ids.field_title.text = issuer or account or "unknown"
+            self.ids.field_title.text = parsed["title"]
             self.ids.field_title.error = False
             self.ids.field_account.text = account
             self.ids.field_title.helper_text_mode = "on_focus"
@@ -1210,9 +1336,20 @@ class QRScanScreen(MDScreen):
         self._camera_check_clock = None
         self._poll_clock = None
         self._decode_log_time = 0.0
-        self._decode_in_progress = False
+        # Один долгоживущий поток декодирования; новый кадр вытесняет ожидающий
+        self._decoder = DecodeWorker(self._decode_frame, self._on_decoded)
+        # Буферы серого кадра, переиспользуются между кадрами (только поток декодера)
+        self._ingest = FrameIngest()
+        # Стадии пробуются в порядке успешности на этом устройстве, в пределах бюджета времени на кадр
+        stages = camera_stages(_qr_decoder, self._ingest)
+        self._cascade = DecodeCascade(
+            [(name, stages[name]) for name in _QR_CAMERA_STAGES],
+            path=get_data_file().with_name("qr_stages.json"),
+        )
         # Игнорировать распознавание до этого времени (чтобы не считать старый кадр при повторном открытии камеры)
         self._decode_after_time = 0.0
+        # Камера была активна в момент on_pause — перезапустить при возврате
+        self._resume_camera = False
 
     # =============================
     # SCREEN EVENTS
@@ -1226,6 +1363,23 @@ class QRScanScreen(MDScreen):
     def on_leave(self, *args):
         self.stop_zbarcam()
 
+    def suspend_camera(self):
+        """App paused: release the camera and stop frame polling."""
+        self._resume_camera = (
+            self.manager is not None and self.manager.current == self.name
+            and not self._camera_failed and not self._found
+        )
+        if self._resume_camera:
+            self.stop_zbarcam()
+
+    def resume_camera(self):
+        """App resumed: start the camera once if it was running before the pause."""
+        if not self._resume_camera:
+            return
+        self._resume_camera = False
+        if self.manager is not None and self.manager.current == self.name:
+            Clock.schedule_once(lambda dt: self.start_zbarcam(), 0.2 if platform != "android" else 0.3)
+
     # =============================
     # ZBARCAM
     # =============================
@@ -1245,7 +1399,8 @@ class QRScanScreen(MDScreen):
                 pass
             self._poll_clock = None
         self._found = False
-        self._decode_in_progress = False
+        self._decoder.reset_stats()
+        self._decoder.start()
 
         # Переиспользуем один экземпляр ZBarCam — KV загружается один раз, меньше Connect/Error 2 циклов
         if self._zbarcam is not None:
@@ -1365,6 +1520,13 @@ class QRScanScreen(MDScreen):
 
     def stop_zbarcam(self, destroy_widget=False):
         """Останавливаем камеру и снимаем с контейнера. destroy_widget=True — сбросить _zbarcam (после Error 2)."""
+        if self._decoder.active or self._decoder.submitted:
+            self._decoder.stop()
+            print(f"[QRScanScreen] Decoder: {self._decoder.stats()}")
+            print(f"[QRScanScreen] Cascade: {self._cascade.stats()}")
+            self._decoder.reset_stats()
+            self._cascade.reset_stats()
+            self._cascade.save()
         if self._camera_check_clock:
             try:
                 self._camera_check_clock.cancel()
@@ -1401,7 +1563,6 @@ class QRScanScreen(MDScreen):
             if destroy_widget:
                 self._zbarcam = None
         self._found = False
-        self._decode_in_progress = False
 
     # =============================
     # QWEENQR / symbols
@@ -1426,45 +1587,14 @@ class QRScanScreen(MDScreen):
             print(f"[QRScanScreen] _on_symbols_changed: {e}")
 
     def _poll_texture_and_decode(self, dt):
-        """Быстро копируем кадр и отправляем на декод в фоне — UI не блокируется."""
-        if self._found or self._zbarcam is None or self._decode_in_progress:
+        """Быстро копируем кадр и отдаём декодеру в фоне — UI не блокируется."""
+        if self._found or self._zbarcam is None:
             return
         if time.time() < self._decode_after_time:
             return
         xc = getattr(self._zbarcam, "xcamera", None)
         src = xc if xc is not None else self._zbarcam
-        tex = getattr(src, "texture", None)
-        if tex is None or tex.pixels is None:
-            return
-        w, h = tex.size
-        if w <= 0 or h <= 0:
-            return
-        try:
-            pixels = tex.pixels.tobytes() if hasattr(tex.pixels, "tobytes") else bytes(tex.pixels)
-        except Exception:
-            return
-        n = len(pixels)
-        if n < w * h * 3:
-            return
-        self._decode_in_progress = True
-        def _decode_in_thread():
-            try:
-                import cv2
-                frame_bgr = None
-                if n >= w * h * 4:
-                    frame = np.frombuffer(pixels, dtype=np.uint8)[: w * h * 4].reshape(h, w, 4)
-                    frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-                else:
-                    frame = np.frombuffer(pixels, dtype=np.uint8)[: w * h * 3].reshape(h, w, 3)
-                    frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                data = _decode_qr_qween(frame_bgr)
-                if data and data.strip():
-                    Clock.schedule_once(lambda dt, d=data: self._on_qr_found_from_background(d), 0)
-            except Exception as e:
-                print(f"[QRScanScreen] decode thread error: {e}")
-            finally:
-                self._decode_in_progress = False
-        threading.Thread(target=_decode_in_thread, daemon=True).start()
+        self._submit_frame(getattr(src, "texture", None))
 
     def _on_qr_found_from_background(self, data):
         """Вызов с фонового потока — переходим в UI и показываем результат."""
@@ -1474,7 +1604,7 @@ class QRScanScreen(MDScreen):
 
     def _process_texture_to_qr(self, texture):
         """Вызов при bind(texture) — тоже в фоне, чтобы не лагало."""
-        if self._found or texture is None or self._decode_in_progress:
+        if self._found or texture is None:
             return
         now = time.time()
         if now < self._decode_after_time:
@@ -1483,38 +1613,39 @@ class QRScanScreen(MDScreen):
             return
         self._last_qween_time = now
         try:
-            pixels = texture.pixels
-            if pixels is None:
-                return
-            w, h = texture.size
-            if w <= 0 or h <= 0:
-                return
-            pixels = pixels.tobytes() if hasattr(pixels, "tobytes") else bytes(pixels)
-            n = len(pixels)
-            if n < w * h * 3:
-                return
-            self._decode_in_progress = True
-            def _decode_in_thread():
-                try:
-                    import cv2
-                    frame_bgr = None
-                    if n >= w * h * 4:
-                        frame = np.frombuffer(pixels, dtype=np.uint8)[: w * h * 4].reshape(h, w, 4)
-                        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
-                    else:
-                        frame = np.frombuffer(pixels, dtype=np.uint8)[: w * h * 3].reshape(h, w, 3)
-                        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                    data = _decode_qr_qween(frame_bgr)
-                    if data and data.strip():
-                        Clock.schedule_once(lambda dt, d=data: self._on_qr_found_from_background(d), 0)
-                except Exception:
-                    pass
-                finally:
-                    self._decode_in_progress = False
-            threading.Thread(target=_decode_in_thread, daemon=True).start()
+            self._submit_frame(texture)
         except Exception as e:
             print(f"[QRScanScreen] qweenQR frame error: {e}")
 
+    def _submit_frame(self, texture):
+        """Копия пикселей текстуры -> почтовый ящик декодера (старый кадр вытесняется)."""
+        if texture is None or not self._decoder.active:
+            return
+        pixels = texture.pixels
+        if pixels is None:
+            return
+        w, h = texture.size
+        if w <= 0 or h <= 0:
+            return
+        # texture.pixels — уже отдельный bytes (glReadPixels), копировать ещё раз не нужно
+        if not isinstance(pixels, (bytes, bytearray)):
+            try:
+                pixels = bytes(pixels)
+            except Exception:
+                return
+        if len(pixels) < w * h * 3:
+            return
+        self._decoder.submit((pixels, w, h))
+
+    def _decode_frame(self, frame):
+        """Выполняется в потоке декодера: пиксели текстуры -> серый кадр (без копий RGBA) -> стадии каскада."""
+        data = self._cascade.run(frame)
+        return data if data and data.strip() else None
+
+    def _on_decoded(self, data):
+        # Поток декодера -> UI
+        Clock.schedule_once(lambda dt, d=data: self._on_qr_found_from_background(d), 0)
+
     def _on_texture_qween(self, instance, texture):
         self._process_texture_to_qr(texture)
 
@@ -1531,7 +1662,7 @@ class QRScanScreen(MDScreen):
         
         # Сохраняем данные QR кода в экране add_edit перед переходом
         try:
-            add_screen = app.sm.get_screen("add_edit")
+            add_screen = app.screen("add_edit")
             add_screen._pending_otpauth = data
             print(f"[QRScanScreen] Saved QR data to add_edit screen")
         except Exception as e:
@@ -1585,65 +1716,15 @@ class QRScanScreen(MDScreen):
             _safe_filechooser(_cb)
 
 
-class AuthenticatorApp(MDApp):
-    """Main application class."""
-
-    _is_desktop = platform not in ('android', 'ios')
+# ── KV rules ─────────────────────────────────────────────────────────
+# One builder per screen so that only the main screen is parsed at startup.
+# Translations are computed on call (after Android initialization).
 
-    def on_resume(self):
-        """Не перезапускаем камеру при on_resume на qr_scan — иначе двойной старт даёт Error 2 и цикл Connect/Stop."""
-        pass
-
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.services = []
-        self.sm = None
-        self._update_event = None
-        self._cards = []
-        self._ntp_dialog = None
-        self._time_offset = 0.0  # offset in seconds vs NTP
-
-    def build(self):
-        # Set data directory (Android-safe: uses app private storage)
-        set_data_dir(self.user_data_dir)
-        print(f"[Authenticator] Data dir: {self.user_data_dir}")
-
-        # Request CAMERA permission at runtime (required on Android 6+)
-        if platform == "android":
-            try:
-                from android.permissions import request_permissions, Permission
-                request_permissions([Permission.CAMERA])
-            except Exception as e:
-                print(f"[Authenticator] Permission request: {e}")
-
-        # Theme configuration
-        self.theme_cls.theme_style = "Dark"
-        self.theme_cls.primary_palette = "Teal"
-        self.theme_cls.accent_palette = "Cyan"
-        self.theme_cls.material_style = "M3"
-
-        # Compute translation variables after Android initialization
-        _app_title = t("Authenticator", "Аутентификатор")
-        _add_service = t("Add Service", "Добавить сервис")
-        _empty_services = t("No services yet.\\nTap + to add the first one.", "Еще нет сервисов.\\nНажмите + чтобы добавить первый сервис.")
-        _edit_service = t("Edit Service", "Редактировать сервис")
-        _backup_codes = t("Backup Codes", "Резервные коды")
-        _hint_title = t("Name *", "Название *")
-        _hint_title_help = t("e.g. Google, GitHub, Discord", "например, Google, GitHub, Discord")
-        _hint_url = t("Service URL", "URL сервиса")
-        _hint_url_help = t("e.g. https://accounts.google.com", "например, https://accounts.google.com")
-        _hint_secret = t("Secret Key *", "Секретный ключ *")
-        _hint_secret_help = t("Base32-encoded secret from the service", "Base32 закодированный секрет от сервиса")
-        _hint_account = t("Account", "Аккаунт")
-        _hint_account_help = t("e.g. user@gmail.com", "например, user@gmail.com")
-        _hint_backup = t("Backup Codes", "Резервные коды")
-        _hint_backup_help = t("Comma-separated backup codes", "Запятая-разделенные резервные коды")
-        _btn_save = t("SAVE", "СОХРАНИТЬ")
-        _btn_update = t("UPDATE", "ОБНОВИТЬ")
-        _scan_qr_title = t("Scan QR Code", "Сканировать QR-код")
-
-        # Build KV with translations using f-string
-        KV = f"""
+def _kv_main():
+    _app_title = t("Authenticator", "Аутентификатор")
+    _add_service = t("Add Service", "Добавить сервис")
+    _empty_services = t("No services yet.\\nTap [b]+[/b] to add the first one.", "Еще нет сервисов.\\nНажмите [b]+[/b] чтобы добавить первый сервис.")
+    return f"""
 #:import Clock kivy.clock.Clock
 
 <ServiceCard>:
@@ -1707,7 +1788,7 @@ class AuthenticatorApp(MDApp):
 
         MDProgressBar:
             id: timer_bar
-            value: root.timer_progress
+            value: root.tick_group.progress if root.tick_group else 0
             color: app.theme_cls.primary_color
             size_hint_y: None
             height: dp(4)
@@ -1715,7 +1796,7 @@ class AuthenticatorApp(MDApp):
 
         MDLabel:
             id: timer_label
-            text: str(int(root.timer_seconds)) + "s"
+            text: (str(int(root.tick_group.seconds)) if root.tick_group else "0") + "s"
             font_style: "Caption"
             theme_text_color: "Hint"
             size_hint_x: None
@@ -1752,29 +1833,48 @@ class AuthenticatorApp(MDApp):
             left_action_items: [["", lambda x: None]]
             right_action_items: [["plus", lambda x: root.open_add_screen(), "{_add_service}"]] if app._is_desktop else [["plus", lambda x: root.open_add_screen()]]
 
-        MDScrollView:
-            id: scroll_view
+        MDLabel:
+            id: empty_label
+            text: "{_empty_services}"
+            markup: True
+            halign: "center"
+            theme_text_color: "Hint"
+            font_style: "Subtitle1"
+            size_hint_y: None
+            height: dp(200)
+            opacity: 1
+
+        # Virtualized list: ServiceCard views exist only for visible rows
+        RecycleView:
+            id: services_list
+            viewclass: "ServiceCard"
             do_scroll_x: False
 
-            MDBoxLayout:
-                id: services_list
+            RecycleBoxLayout:
                 orientation: "vertical"
                 padding: dp(12), dp(12)
                 spacing: dp(12)
+                default_size: None, dp(140)
+                default_size_hint: 1, None
                 size_hint_y: None
                 height: self.minimum_height
-
-                MDLabel:
-                    id: empty_label
-                    text: "{_empty_services}"
-                    halign: "center"
-                    theme_text_color: "Hint"
-                    font_style: "Subtitle1"
-                    size_hint_y: None
-                    height: dp(200)
-                    opacity: 1
+"""
 
 
+def _kv_add_edit():
+    _add_service = t("Add Service", "Добавить сервис")
+    _hint_title = t("Name *", "Название *")
+    _hint_title_help = t("e.g. Google, GitHub, Discord", "например, Google, GitHub, Discord")
+    _hint_url = t("Service URL", "URL сервиса")
+    _hint_url_help = t("e.g. https://accounts.google.com", "например, https://accounts.google.com")
+    _hint_secret = t("Secret Key *", "Секретный ключ *")
+    _hint_secret_help = t("Base32-encoded secret from the service", "Base32 закодированный секрет от сервиса")
+    _hint_account = t("Account", "Аккаунт")
+    _hint_account_help = t("e.g. user@gmail.com", "например, user@gmail.com")
+    _hint_backup = t("Backup Codes", "Резервные коды")
+    _hint_backup_help = t("Comma-separated backup codes", "Запятая-разделенные резервные коды")
+    _btn_save = t("SAVE", "СОХРАНИТЬ")
+    return f"""
 <AddEditScreen>:
     name: "add_edit"
 
@@ -1864,8 +1964,12 @@ class AuthenticatorApp(MDApp):
                 Widget:
                     size_hint_y: None
                     height: dp(24)
+"""
 
 
+def _kv_backup_codes():
+    _backup_codes = t("Backup Codes", "Резервные коды")
+    return f"""
 <BackupCodesScreen>:
     name: "backup_codes"
 
@@ -1891,8 +1995,11 @@ class AuthenticatorApp(MDApp):
                 spacing: dp(8)
                 size_hint_y: None
                 height: self.minimum_height
+"""
 
 
+def _kv_qr_scan():
+    return """
 <QRScanScreen>:
     name: "qr_scan"
 
@@ -1910,46 +2017,176 @@ class AuthenticatorApp(MDApp):
             size_hint: 1, 1
 """
 
-        Builder.load_string(KV)
 
-        # Load saved services
-        self.services = load_services()
+class AuthenticatorApp(MDApp):
+    """Main application class."""
+
+    _is_desktop = platform not in ('android', 'ios')
+
+    def on_resume(self):
+        """Камера останавливается в on_pause, поэтому здесь она стартует ровно один раз (без двойного старта и Error 2)."""
+        self.lifecycle.resume()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.vault = None
+        self.services = []
+        self.sm = None
+        # Single corrected time source (monotonic + NTP offset) for codes and countdowns
+        self.clock = CorrectedClock()
+        self.clock.add_listener(self._on_clock_changed)
+        self.totp_engine = TOTPEngine(clock=self.clock)
+        self.code_scheduler = CodeScheduler(self.totp_engine, self.clock)
+        self.clock_sync = None
+        self._clock_sync_event = None
+        self._ntp_notified = False
+        self._ntp_dialog = None
+        self.lifecycle = LifecycleManager()
+        self._screens = {}  # lazily built screens by name
+
+    def build(self):
+        # Set data directory (Android-safe: uses app private storage)
+        set_data_dir(self.user_data_dir)
+        print(f"[Authenticator] Data dir: {self.user_data_dir}")
+        _setup_text_input(self.user_data_dir)
+
+        # Offset history next to services.json: use the cached prediction right away,
+        # go to the network only when its predicted error is too large
+        self.clock_sync = ClockSync(self.clock, get_data_file().with_name(OFFSETS_FILE))
+        # Applied silently: "Clock synced" / out-of-sync messages are for real NTP results only
+        cached_offset = self.clock_sync.apply_prediction()
+        if cached_offset is not None:
+            print(f"[Authenticator] Cached clock offset: {cached_offset:+.2f}s")
+
+        # Request CAMERA permission at runtime (required on Android 6+)
+        if platform == "android":
+            try:
+                from android.permissions import request_permissions, Permission
+                request_permissions([Permission.CAMERA])
+            except Exception as e:
+                print(f"[Authenticator] Permission request: {e}")
+
+        # Theme configuration
+        self.theme_cls.theme_style = "Dark"
+        self.theme_cls.primary_palette = "Teal"
+        self.theme_cls.accent_palette = "Cyan"
+        self.theme_cls.material_style = "M3"
+
+        # Only the main screen's KV is loaded at startup; the rest on first navigation
+        Builder.load_string(_kv_main())
+
+        # Load saved services (snapshot + journal replay); self.services is the vault's live list
+        # Write-behind: mutations are saved by a background thread, not on the UI thread
+        self.vault = open_vault(get_data_file(), VAULT_BACKEND, write_behind=True)
+        self.services = self.vault.services
 
-        # Screen manager
+        # Screen manager: other screens are built on first navigation (see screen())
         self.sm = MDScreenManager()
         self.main_screen = MainScreen()
-        self.add_edit_screen = AddEditScreen()
-        self.backup_screen = BackupCodesScreen()
-        self.qr_scan_screen = QRScanScreen()
-
         self.sm.add_widget(self.main_screen)
-        self.sm.add_widget(self.add_edit_screen)
-        self.sm.add_widget(self.backup_screen)
-        self.sm.add_widget(self.qr_scan_screen)
 
         # Populate services list
         self.refresh_main_screen()
 
-        # Schedule TOTP code updates every second
-        self._update_event = Clock.schedule_interval(self._update_all_codes, 1)
+        # Background work stops while the app is paused / minimized
+        self.lifecycle.register("vault", self.vault.flush)
+        self.lifecycle.register("codes", self.code_scheduler.suspend, self.code_scheduler.resume)
+        self.lifecycle.register("clock sync", self._suspend_clock_sync, self._check_clock_sync)
+        self.lifecycle.register("camera", self._suspend_camera, self._resume_camera)
+        if self._is_desktop:
+            Window.bind(on_minimize=lambda *a: self.lifecycle.pause(),
+                        on_restore=lambda *a: self.lifecycle.resume())
+
+        # Check system clock against NTP in background (only if the cache is too old)
+        self._check_clock_sync()
 
-        # Check system clock against NTP in background
-        check_ntp_offset(self._on_ntp_result)
+        # Report once the first frame with codes has been drawn
+        Clock.schedule_once(lambda dt: Clock.schedule_once(self._report_startup))
 
         return self.sm
 
+    # name -> (screen class, KV builder); built by screen() on first use
+    _LAZY_SCREENS = {
+        "add_edit": (AddEditScreen, _kv_add_edit),
+        "backup_codes": (BackupCodesScreen, _kv_backup_codes),
+        "qr_scan": (QRScanScreen, _kv_qr_scan),
+    }
+
+    def screen(self, name):
+        """Screen by name; lazy screens get their KV loaded and are created on first call."""
+        screen = self._screens.get(name)
+        if screen is None:
+            t0 = time.perf_counter()
+            cls, kv = self._LAZY_SCREENS[name]
+            Builder.load_string(kv())
+            screen = self._screens[name] = cls()
+            self.sm.add_widget(screen)
+            print(f"[Authenticator] Built screen {name} in {(time.perf_counter() - t0) * 1e3:.0f} ms")
+        return screen
+
+    @property
+    def add_edit_screen(self):
+        return self.screen("add_edit")
+
+    @property
+    def backup_screen(self):
+        return self.screen("backup_codes")
+
+    @property
+    def qr_scan_screen(self):
+        return self.screen("qr_scan")
+
+    def _report_startup(self, dt):
+        elapsed = time.perf_counter() - _T_START
+        print(f"[Authenticator] First codes on screen {elapsed * 1e3:.0f} ms after start")
+
+    def _suspend_camera(self):
+        qr_screen = self._screens.get("qr_scan")
+        if qr_screen is not None:
+            qr_screen.suspend_camera()
+
+    def _resume_camera(self):
+        qr_screen = self._screens.get("qr_scan")
+        if qr_screen is not None:
+            qr_screen.resume_camera()
+
+    # Retry interval while NTP is unreachable (seconds)
+    CLOCK_SYNC_RETRY = 300
+
+    def _check_clock_sync(self, *_args):
+        """Re-sync NTP in the background only when the predicted offset error is too large."""
+        self._clock_sync_event = None
+        if self.clock_sync.needs_sync():
+            self.clock_sync.sync_async(self._on_ntp_result)
+            delay = self.CLOCK_SYNC_RETRY
+        else:
+            # Follow the estimated drift between syncs
+            predicted = self.clock_sync.predict()
+            if predicted is not None and abs(predicted[0] - self.clock.offset) > 0.05:
+                self.clock_sync.apply_prediction()
+            delay = max(self.clock_sync.next_check_delay(), 60)
+        self._clock_sync_event = Clock.schedule_once(self._check_clock_sync, delay)
+
+    def _suspend_clock_sync(self):
+        if self._clock_sync_event:
+            self._clock_sync_event.cancel()
+            self._clock_sync_event = None
+
     def _on_ntp_result(self, offset):
         """Called from background thread with NTP offset result."""
         # Schedule UI update on main thread
         Clock.schedule_once(lambda dt: self._handle_ntp_offset(offset))
 
     def _handle_ntp_offset(self, offset):
-        """Handle NTP check result on main thread."""
+        """Handle NTP check result on main thread (offset is already applied to self.clock)."""
         if offset is None:
             # Could not reach NTP servers — no internet or firewall
             return
+        # Background re-syncs are silent; notify once per session
+        if self._ntp_notified:
+            return
+        self._ntp_notified = True
 
-        self._time_offset = offset
         abs_offset = abs(offset)
 
         if abs_offset > 5:
@@ -1986,65 +2223,102 @@ class AuthenticatorApp(MDApp):
         else:
             toast(t("Clock synced (offset: {:.1f}s)", "Часы синхронизированы (смещение: {:.1f}s)").format(abs_offset))
 
+    def _on_clock_changed(self, reason, delta):
+        """Corrected clock re-anchored (may be called from a background thread)."""
+        print(f"[Authenticator] Clock {reason}: {delta:+.2f}s")
+        Clock.schedule_once(lambda dt: self.code_scheduler.resync())
+        if reason == "jump" and self.clock_sync is not None:
+            if CLOCK_COUNTS_SUSPEND:
+                # Offsets were measured against the old system time: shift them, then confirm
+                self.clock_sync.on_jump(delta)
+                self.clock_sync.apply_prediction()
+            # Otherwise the "jump" may be sleep time (monotonic clock stopped): the clock
+            # has re-anchored to the wall time, the saved history stays as is
+            self.clock_sync.sync_async(self._on_ntp_result)
+
     def go_back(self):
         """Navigate back from QR scan to add_edit screen."""
-        if hasattr(self, "qr_scan_screen") and self.qr_scan_screen:
-            self.qr_scan_screen.stop_zbarcam()
+        qr_screen = self._screens.get("qr_scan")
+        if qr_screen is not None:
+            qr_screen.stop_zbarcam()
         self.sm.transition.direction = "right"
         self.sm.current = "add_edit"
 
-    def refresh_main_screen(self):
-        """Rebuild the services list on main screen."""
-        container = self.main_screen.ids.services_list
-        container.clear_widgets()
-        self._cards.clear()
+    @staticmethod
+    def _service_row(service):
+        """RecycleView data item for a service (see ServiceCard.refresh_view_attrs)."""
+        return {
+            "service_id": service["id"],
+            "title": service.get("title", "Unknown"),
+            "account": service.get("account", ""),
+            "period": otp_params(service)[0],
+        }
 
-        if not self.services:
-            # Show empty state
-            empty_label = MDLabel(
-                text=t("No services yet.\nTap [b]+[/b] to add the first one.", "Еще нет сервисов.\nНажмите [b]+[/b] чтобы добавить первый сервис."),
-                halign="center",
-                theme_text_color="Hint",
-                font_style="Subtitle1",
-                size_hint_y=None,
-                height=dp(200),
-                markup=True,
-            )
-            container.add_widget(empty_label)
+    def refresh_main_screen(self):
+        """Rebuild the RecycleView data for the whole services list (startup, bulk changes)."""
+        self.totp_engine.set_services((s["id"], s) for s in self.services)
+        self.code_scheduler.set_periods(self.totp_engine.periods())
+        self._update_empty_state()
+        self.main_screen.ids.services_list.data = [self._service_row(s) for s in self.services]
+
+    def reconcile_service(self, service_id, old_pos=-1):
+        """
+        Apply one add/update/move/delete to the engine and the RecycleView data
+        instead of rebuilding everything. old_pos: the service's row before the
+        change (-1 if it is new). Only that row's view is rebound.
+        """
+        data = self.main_screen.ids.services_list.data
+        service = self.vault.get(service_id)
+        pos = self.vault.index_of(service_id)
+        if service is None:
+            self.totp_engine.remove(service_id)
+            if 0 <= old_pos < len(data):
+                data.pop(old_pos)
         else:
-            for i, service in enumerate(self.services):
-                card = ServiceCard(service_data=service, index=i)
-                self._cards.append(card)
-                container.add_widget(card)
-
-    def _update_all_codes(self, dt):
-        """Update TOTP codes on all visible cards."""
-        for card in self._cards:
-            card._update_code()
+            self.totp_engine.update(service_id, service)
+            row = self._service_row(service)
+            if old_pos < 0:
+                data.insert(pos, row)
+            elif old_pos != pos:
+                data.pop(old_pos)
+                data.insert(pos, row)
+            else:
+                data[pos] = row
+        if set(self.totp_engine.periods()) != set(self.code_scheduler.periods()):
+            self.code_scheduler.set_periods(self.totp_engine.periods())
+        self._update_empty_state()
+
+    def _update_empty_state(self):
+        empty_label = self.main_screen.ids.empty_label
+        if self.services:
+            empty_label.opacity, empty_label.height = 0, 0
+        else:
+            # Show empty state
+            empty_label.opacity, empty_label.height = 1, dp(200)
 
     def open_add_screen(self):
         """Navigate to add service screen."""
-        self.add_edit_screen.editing_index = -1
+        self.add_edit_screen.editing_id = ""
         self.sm.transition.direction = "left"
         self.sm.current = "add_edit"
 
-    def open_edit_screen(self, index: int):
+    def open_edit_screen(self, service_id: str):
         """Navigate to edit service screen."""
-        self.add_edit_screen.editing_index = index
+        self.add_edit_screen.editing_id = service_id
         self.sm.transition.direction = "left"
         self.sm.current = "add_edit"
 
-    def delete_service(self, index: int):
-        """Delete a service by index."""
-        if 0 <= index < len(self.services):
-            removed = self.services.pop(index)
-            save_services(self.services)
-            self.refresh_main_screen()
+    def delete_service(self, service_id: str):
+        """Delete a service by id."""
+        old_pos = self.vault.index_of(service_id)
+        removed = self.vault.delete(service_id)
+        if removed is not None:
+            self.reconcile_service(service_id, old_pos)
             toast(f'"{removed.get("title", "")}" ' + t("deleted", "удален"))
 
-    def open_backup_codes(self, index: int):
+    def open_backup_codes(self, service_id: str):
         """Show backup codes for a service."""
-        service = self.services[index]
+        service = self.vault.get_full(service_id)
         container = self.backup_screen.ids.codes_container
         container.clear_widgets()
 
@@ -2082,11 +2356,20 @@ class AuthenticatorApp(MDApp):
         self.sm.transition.direction = "left"
         self.sm.current = "backup_codes"
 
+    def on_pause(self):
+        """
+        Stop codes, clock sync and camera. Android may kill a paused app
+        without on_stop, so pending vault changes are written first.
+        """
+        self.lifecycle.pause()
+        return True
+
     def on_stop(self):
-        """Save data on app exit."""
-        if self._update_event:
-            self._update_event.cancel()
-        save_services(self.services)
+        """Stop timers and close the vault (flushes only if changes are pending)."""
+        self.code_scheduler.stop()
+        self._suspend_clock_sync()
+        if self.vault is not None:
+            self.vault.close()
 
 
 if __name__ == "__main__":
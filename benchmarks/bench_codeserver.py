@@ -0,0 +1,135 @@
+"""
+Load test: code lookups per second and latency against the code server.
+
+  per-script — what test scripts did before: open the vault and compute the
+               code(s) for every lookup
+  server     — authcore.codeserver in a separate process, N client processes
+               each sending requests over one persistent connection
+
+Run from the repo root:  python benchmarks/bench_codeserver.py [entries] [clients] [batch] [seconds]
+"""
+
+import base64
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from authcore.codeserver import CodeClient  # noqa: E402
+from authcore.totp import TOTPEngine  # noqa: E402
+from authcore.vault import open_vault  # noqa: E402
+
+
+def _make_vault(directory, n):
+    services = [
+        {
+            "title": f"Service {i}",
+            "account": f"user{i}@example.com",
+            "secret": base64.b32encode(os.urandom(20)).decode().rstrip("="),
+            "period": 60 if i % 10 == 0 else 30,
+        }
+        for i in range(n)
+    ]
+    path = os.path.join(directory, "services.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(services, f)
+    vault = open_vault(path)  # assign ids once, like the app does
+    ids = [s["id"] for s in vault.services]
+    vault.close()
+    return path, ids
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _per_script(path, ids, batch, seconds):
+    """Re-open the vault and compute per lookup (the old way)."""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        wanted = random.sample(ids, batch)
+        t0 = time.perf_counter()
+        vault = open_vault(path, read_only=True)
+        engine = TOTPEngine()
+        engine.set_services((sid, vault.get(sid)) for sid in wanted)
+        vault.close()
+        [engine.code(sid) for sid in wanted]
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def _client(args):
+    socket_path, ids, batch, seconds = args
+    latencies = []
+    with CodeClient(socket_path) as client:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            wanted = random.sample(ids, batch)
+            t0 = time.perf_counter()
+            codes = client.get(wanted)
+            latencies.append(time.perf_counter() - t0)
+            assert None not in codes
+    return latencies
+
+
+def _wait_for(socket_path, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with CodeClient(socket_path) as client:
+                client.request({"ping": 1})
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("code server did not start")
+
+
+def _report(name, latencies, seconds, batch):
+    rps = len(latencies) / seconds
+    print(f"{name:<18} {rps:>9.0f} {rps * batch:>10.0f} "
+          f"{_percentile(latencies, 0.5) * 1e3:>8.3f} {_percentile(latencies, 0.99) * 1e3:>8.3f}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 5.0
+
+    d = tempfile.mkdtemp()
+    server = None
+    try:
+        path, ids = _make_vault(d, n)
+        socket_path = os.path.join(d, "codes.sock")
+        print(f"{n} services, batch of {batch} codes per request, {seconds:.0f}s per run")
+        print(f"{'mode':<18} {'req/s':>9} {'codes/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+        _report("per-script", _per_script(path, ids, batch, min(seconds, 3.0)), min(seconds, 3.0), batch)
+
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "cli.py"), "--serve", "--data-dir", d, "--socket", socket_path],
+            stdout=subprocess.DEVNULL,
+        )
+        _wait_for(socket_path)
+        for count in sorted({1, clients}):
+            with multiprocessing.Pool(count) as pool:
+                results = pool.map(_client, [(socket_path, ids, batch, seconds)] * count)
+            _report(f"server x{count}", [lat for r in results for lat in r], seconds, batch)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(d, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: NTP offset latency and accuracy against local stand-in servers.
+
+  sequential — the old check_ntp_offset loop: one server after another,
+               per-server timeout, offset from t3 and the send/recv midpoint
+  concurrent — authcore.ntp.query_ntp: all servers at once, lowest delay wins,
+               full four-timestamp offset
+
+Scenarios mimic a bad network: dead servers first in the list and
+asymmetric paths. True offset is known, so the error is exact.
+
+Run from the repo root:  python benchmarks/bench_ntp.py
+"""
+
+import os
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from authcore.ntp import NTP_EPOCH, query_ntp  # noqa: E402
+from ntp_standin import NTPStandIn  # noqa: E402
+
+TRUE_OFFSET = 2.5
+TIMEOUT = 1.0
+
+SCENARIOS = {
+    "all healthy": [dict(delay_in=0.02, delay_out=0.02)] * 4,
+    "2 dead first": [dict(drop=True), dict(drop=True), dict(delay_in=0.03, delay_out=0.03),
+                     dict(delay_in=0.01, delay_out=0.01)],
+    "asymmetric": [dict(delay_in=0.01, delay_out=0.15), dict(delay_in=0.02, delay_out=0.02),
+                   dict(delay_in=0.15, delay_out=0.01), dict(delay_in=0.05, delay_out=0.05)],
+}
+
+
+def _sequential(servers, timeout):
+    """Faithful copy of the previous check_ntp_offset worker."""
+    for server in servers:
+        try:
+            packet = b'\x1b' + 47 * b'\0'
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.settimeout(timeout)
+            sock.sendto(packet, server)
+            local_send = time.time()
+            data, _ = sock.recvfrom(1024)
+            local_recv = time.time()
+            sock.close()
+            if len(data) < 48:
+                continue
+            ntp_time = struct.unpack('!I', data[40:44])[0] - NTP_EPOCH
+            ntp_fraction = struct.unpack('!I', data[44:48])[0] / (2**32)
+            return ntp_time + ntp_fraction - (local_send + local_recv) / 2
+        except (socket.error, OSError, struct.error):
+            continue
+    return None
+
+
+def main():
+    print(f"true offset {TRUE_OFFSET:+.3f}s, timeout {TIMEOUT}s")
+    print(f"{'scenario':<14} {'method':<11} {'latency ms':>11} {'error ms':>9}")
+    for name, configs in SCENARIOS.items():
+        servers = [NTPStandIn(offset=TRUE_OFFSET, **c).start() for c in configs]
+        addrs = [s.address for s in servers]
+        try:
+            t0 = time.perf_counter()
+            offset = _sequential(addrs, TIMEOUT)
+            seq_latency = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            sample = query_ntp(addrs, TIMEOUT)
+            con_latency = time.perf_counter() - t0
+        finally:
+            for s in servers:
+                s.stop()
+        for method, latency, value in (
+            ("sequential", seq_latency, offset),
+            ("concurrent", con_latency, sample.offset if sample else None),
+        ):
+            err = "-" if value is None else f"{abs(value - TRUE_OFFSET) * 1e3:.2f}"
+            print(f"{name:<14} {method:<11} {latency * 1e3:>11.1f} {err:>9}")
+
+
+if __name__ == "__main__":
+    main()
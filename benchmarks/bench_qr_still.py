@@ -0,0 +1,102 @@
+"""
+Benchmark: QR decode latency on still photos of different sizes.
+
+  full     — what _decode_qr_from_path did: equalizeHist + GaussianBlur +
+             QRCodeDetector on the full-resolution image, then three rotations
+  pyramid  — QRDecoder.decode_still: small levels first, crop at full resolution
+
+The test photos are synthetic: a QR code covering a given share of the
+shorter side, pasted with a slight perspective on a noisy gradient,
+softened like a camera image and saved as JPEG. Both modes decode the
+same grayscale image (JPEG decoding is timed separately). Needs numpy and
+OpenCV.
+
+Run from the repo root:  python benchmarks/bench_qr_still.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from authcore.imaging import cv2, np  # noqa: E402
+from authcore.qrscan import QRDecoder  # noqa: E402
+
+URI = "otpauth://totp/Example:alice@example.com?secret=JBSWY3DPEHPK3PXP&issuer=Example"
+# (width, height) of the photo, share of the shorter side covered by the code
+CASES = (
+    ((1280, 960), 0.5),
+    ((4000, 3000), 0.5),
+    ((4000, 3000), 0.15),
+    ((4624, 3472), 0.3),
+)
+REPEAT = 3
+
+
+def _make_photo(size, share, seed=0):
+    w, h = size
+    rng = np.random.default_rng(seed)
+    photo = np.tile(np.linspace(90, 200, w, dtype=np.float32), (h, 1))
+    photo += rng.normal(0, 4, (h, w)).astype(np.float32)
+    code = cv2.QRCodeEncoder.create().encode(URI)
+    code = np.pad(code, 4, constant_values=255)  # quiet zone
+    side = int(min(w, h) * share)
+    x, y = w // 3, h // 4
+    src = np.float32([[0, 0], [code.shape[1], 0], [code.shape[1], code.shape[0]], [0, code.shape[0]]])
+    dst = np.float32([[x, y], [x + side, y + side * 0.04], [x + side * 0.97, y + side], [x - side * 0.02, y + side * 0.98]])
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    code = cv2.warpPerspective(code.astype(np.float32), matrix, (w, h), borderValue=-1, flags=cv2.INTER_LINEAR)
+    mask = code >= 0
+    photo[mask] = code[mask] * 0.8 + 20
+    # Lens / demosaicing softness of a real camera
+    photo = cv2.GaussianBlur(photo, (0, 0), 1.2)
+    return np.clip(photo, 0, 255).astype(np.uint8)
+
+
+def _full(gray, detector):
+    """The old full-resolution path (on the grayscale image)."""
+    image = cv2.GaussianBlur(cv2.equalizeHist(gray), (3, 3), 0)
+    data, _, _ = detector.detectAndDecode(image)
+    if data:
+        return data
+    for rot in (cv2.ROTATE_90_CLOCKWISE, cv2.ROTATE_90_COUNTERCLOCKWISE, cv2.ROTATE_180):
+        data, _, _ = detector.detectAndDecode(cv2.equalizeHist(cv2.rotate(gray, rot)))
+        if data:
+            return data
+    return None
+
+
+def _best(fn, repeat=REPEAT):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    decoder = QRDecoder()
+    detector = cv2.QRCodeDetector()
+    d = tempfile.mkdtemp()
+    print(f"{'photo':>10} {'code':>5} {'jpeg ms':>8} {'full ms':>8} {'pyramid ms':>11} {'speedup':>8}  found")
+    try:
+        for (w, h), share in CASES:
+            path = os.path.join(d, f"{w}x{h}.jpg")
+            cv2.imwrite(path, _make_photo((w, h), share), [cv2.IMWRITE_JPEG_QUALITY, 90])
+            t_read, gray = _best(lambda: cv2.imread(path, cv2.IMREAD_GRAYSCALE))
+            t_full, full = _best(lambda: _full(gray, detector), repeat=1)
+            t_pyr, pyr = _best(lambda: decoder.decode_still(gray))
+            found = f"{'yes' if full == URI else 'no'}/{'yes' if pyr == URI else 'no'}"
+            print(f"{w:>5}x{h:<4} {share:>5.0%} {t_read * 1e3:>8.0f} {t_full * 1e3:>8.0f} "
+                  f"{t_pyr * 1e3:>11.0f} {t_full / t_pyr:>7.1f}x  {found}")
+    finally:
+        for name in os.listdir(d):
+            os.remove(os.path.join(d, name))
+        os.rmdir(d)
+
+
+if __name__ == "__main__":
+    main()
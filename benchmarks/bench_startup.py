@@ -0,0 +1,105 @@
+"""
+Benchmark: cold start time to the first frame with codes on screen.
+
+  lazy   — only the main screen's KV and instance at startup (the app as shipped)
+  eager  — all four screens built in build(), as before
+
+Each run starts a fresh process of this script in harness mode: it
+subclasses AuthenticatorApp to point it at a seeded data dir, to build
+every screen in build() for "eager", and to exit once the first frame with
+codes has been drawn (AuthenticatorApp._report_startup). The time is
+measured from the harness process start, before Kivy is imported. Needs
+Kivy/KivyMD and a display (SDL_VIDEODRIVER=offscreen works headless).
+
+Run from the repo root:  python benchmarks/bench_startup.py [runs] [services]
+"""
+
+import base64
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_T0 = time.perf_counter()
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_REPORT = re.compile(r"\[bench\] first codes (\d+) ms")
+
+
+def _harness(mode, data_dir):
+    """Child process: run the app once and exit after the first frame with codes."""
+    os.environ["KIVY_NO_ARGS"] = "1"  # the harness arguments are not Kivy options
+    sys.path.insert(0, ROOT)
+    from authenticator import AuthenticatorApp
+
+    class BenchApp(AuthenticatorApp):
+        @property
+        def user_data_dir(self):
+            return data_dir
+
+        def build(self):
+            root = super().build()
+            if mode == "eager":
+                for name in self._LAZY_SCREENS:
+                    self.screen(name)
+            return root
+
+        def _report_startup(self, dt):
+            super()._report_startup(dt)
+            print(f"[bench] first codes {(time.perf_counter() - _T0) * 1e3:.0f} ms", flush=True)
+            self.stop()
+
+    BenchApp().run()
+
+
+def _make_data_dir(n):
+    d = tempfile.mkdtemp()
+    services = [
+        {"title": f"Service {i}", "account": f"user{i}@example.com",
+         "secret": base64.b32encode(os.urandom(20)).decode().rstrip("=")}
+        for i in range(n)
+    ]
+    with open(os.path.join(d, "services.json"), "w", encoding="utf-8") as f:
+        json.dump(services, f)
+    return d
+
+
+def _run(mode, data_dir):
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--harness", mode, data_dir],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    ).stdout
+    wall = (time.perf_counter() - t0) * 1e3
+    match = _REPORT.search(out)
+    if match is None:
+        raise RuntimeError("no startup report in output:\n" + out[-2000:])
+    return int(match.group(1)), wall
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    data_dir = _make_data_dir(n)
+    try:
+        print(f"{runs} runs, {n} services, median ms")
+        print(f"{'mode':<6} {'first codes':>12} {'process':>9}")
+        for mode in ("eager", "lazy"):
+            _run(mode, data_dir)  # warm the OS file cache
+            results = [_run(mode, data_dir) for _ in range(runs)]
+            first = statistics.median(r[0] for r in results)
+            wall = statistics.median(r[1] for r in results)
+            print(f"{mode:<6} {first:>12.0f} {wall:>9.0f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--harness":
+        _harness(sys.argv[2], sys.argv[3])
+    else:
+        main()
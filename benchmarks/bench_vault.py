@@ -0,0 +1,98 @@
+"""
+Benchmark: open / edit / add+delete on a large vault, per storage backend.
+
+  legacy  — json.load + json.dump(indent=2) of the whole list per save
+  json    — services.json snapshot + append-only journal (authcore.vault)
+  sqlite  — services.db with lazy url/backup_codes (authcore.sqlite_store)
+
+Run from the repo root:  python benchmarks/bench_vault.py [entries]
+"""
+
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from authcore.vault import open_vault  # noqa: E402
+
+EDITS = 50
+
+
+def _make_services(n):
+    return [
+        {
+            "title": f"Service {i}",
+            "url": f"https://example{i}.com/login",
+            "secret": base64.b32encode(os.urandom(20)).decode().rstrip("="),
+            "account": f"user{i}@example.com",
+            "backup_codes": ", ".join(f"{j:08d}" for j in range(10)),
+        }
+        for i in range(n)
+    ]
+
+
+def _ms(t0):
+    return (time.perf_counter() - t0) * 1e3
+
+
+def bench_legacy(path):
+    t0 = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        services = json.load(f)
+    load = _ms(t0)
+    t0 = time.perf_counter()
+    for i in range(EDITS):
+        services[i]["title"] += "!"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(services, f, ensure_ascii=False, indent=2)
+    return load, _ms(t0) / EDITS
+
+
+def bench_vault(path, backend):
+    vault = open_vault(path, backend)  # first open migrates / assigns ids
+    vault.close()
+    t0 = time.perf_counter()
+    vault = open_vault(path, backend)
+    load = _ms(t0)
+    ids = [s["id"] for s in vault.services[:EDITS]]
+    t0 = time.perf_counter()
+    for sid in ids:
+        record = vault.get_full(sid)
+        vault.update(sid, dict(record, title=record["title"] + "!"))
+    edit = _ms(t0) / EDITS
+    t0 = time.perf_counter()
+    for _ in range(EDITS):
+        vault.delete(vault.add({"title": "tmp", "secret": "JBSWY3DPEHPK3PXP"}))
+    churn = _ms(t0) / EDITS
+    vault.close()
+    return load, edit, churn
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    services = _make_services(n)
+    print(f"{n} services, {EDITS} edits (ms)")
+    print(f"{'backend':<8} {'open':>8} {'edit':>8} {'add+del':>8}")
+    for backend in ("legacy", "json", "sqlite"):
+        d = tempfile.mkdtemp()
+        path = os.path.join(d, "services.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(services, f, ensure_ascii=False, indent=2)
+        try:
+            if backend == "legacy":
+                load, edit = bench_legacy(path)
+                churn = float("nan")
+            else:
+                load, edit, churn = bench_vault(path, backend)
+        finally:
+            shutil.rmtree(d, ignore_errors=True)
+        print(f"{backend:<8} {load:>8.1f} {edit:>8.2f} {churn:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
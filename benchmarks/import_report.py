@@ -0,0 +1,53 @@
+"""
+Import-time report (python -X importtime), grouped by top-level package.
+
+Shows what `import authenticator` costs before the first frame. numpy, PIL,
+cv2 and pyzbar should be absent: they are imported through authcore.imaging
+only when a QR code is scanned. Compare with an older checkout to see the
+savings.
+
+Run from the repo root:  python benchmarks/import_report.py [module] [top]
+"""
+
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+HEAVY = ("numpy", "PIL", "cv2", "pyzbar")
+
+
+def importtime(module):
+    """{top-level package: self time in us summed over its modules}."""
+    env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1")
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=300,
+    ).stderr
+    totals = defaultdict(int)
+    for line in err.splitlines():
+        match = _LINE.match(line)
+        if match:
+            totals[match.group(4).split(".")[0]] += int(match.group(1))
+    if not totals:
+        raise RuntimeError(f"import {module} failed:\n{err[-2000:]}")
+    return totals
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else "authenticator"
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    totals = importtime(module)
+    print(f"import {module}: {sum(totals.values()) / 1e3:.1f} ms total")
+    print(f"{'package':<24} {'ms':>8}")
+    for name, us in sorted(totals.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{name:<24} {us / 1e3:>8.1f}")
+    heavy = [name for name in HEAVY if name in totals]
+    print("imaging stack at startup:", ", ".join(heavy) if heavy else "none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Local UDP stand-in for an NTP server, for offline latency/accuracy benchmarks.
+
+The server's clock runs `offset` seconds ahead of time.time(); each request
+is delayed `delay_in` seconds before the receive timestamp (t2) and
+`delay_out` seconds after the transmit timestamp (t3), emulating a network
+path. `drop=True` never answers (dead server).
+
+Standalone:  python benchmarks/ntp_standin.py --port 12300 --offset 2.5 --delay 0.05
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from authcore.ntp import NTP_EPOCH  # noqa: E402
+
+
+def _to_ntp(ts):
+    ts += NTP_EPOCH
+    return struct.pack("!II", int(ts), int((ts % 1) * 2**32))
+
+
+class NTPStandIn:
+    def __init__(self, offset=0.0, delay_in=0.0, delay_out=0.0, drop=False, host="127.0.0.1", port=0):
+        self.offset = offset
+        self.delay_in = delay_in
+        self.delay_out = delay_out
+        self.drop = drop
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.address = self.sock.getsockname()
+        self.requests = 0
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self.sock.close()
+
+    def _serve(self):
+        while self._running:
+            try:
+                data, addr = self.sock.recvfrom(1024)
+            except OSError:
+                return
+            self.requests += 1
+            if self.drop or len(data) < 48:
+                continue
+            # Reply from a timer so slow requests don't serialize
+            threading.Timer(self.delay_in, self._reply, (data, addr)).start()
+
+    def _reply(self, data, addr):
+        t2 = time.time() + self.offset
+        reply = bytearray(48)
+        reply[0] = (0 << 6) | (3 << 3) | 4  # LI=0, VN=3, Mode=server
+        reply[1] = 1  # stratum
+        reply[24:32] = data[40:48]  # originate = client's transmit
+        reply[32:40] = _to_ntp(t2)
+        t3 = time.time() + self.offset
+        reply[40:48] = _to_ntp(t3)
+        if self.delay_out:
+            time.sleep(self.delay_out)
+        try:
+            self.sock.sendto(bytes(reply), addr)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=12300)
+    parser.add_argument("--offset", type=float, default=0.0)
+    parser.add_argument("--delay", type=float, default=0.0, help="one-way delay, seconds")
+    args = parser.parse_args()
+    server = NTPStandIn(args.offset, args.delay, args.delay, port=args.port).start()
+    print(f"NTP stand-in on {server.address}, offset {args.offset:+.3f}s, one-way delay {args.delay}s")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,10 @@ source.dir = .
 source.include_exts = py,png,jpg,kv,atlas,json
 
 # (list) Source files to exclude (let empty to not exclude anything)
-source.exclude_dirs = .git,.github,.venv,__pycache__,bin
+source.exclude_dirs = .git,.github,.venv,__pycache__,bin,benchmarks
+
+# (list) List of exclusions using pattern matching
+source.exclude_patterns = cli.py
 
 # (str) Application versioning
 version = 1.0.0
@@ -24,7 +27,7 @@ version = 1.0.0
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
 # Убраны неиспользуемые: materialyoucolor, exceptiongroup, asyncgui, asynckivy, filetype
-requirements = python3,kivy==2.3.1,kivymd==1.2.0,pyotp,pillow,plyer,numpy,opencv,libiconv,libzbar,pyzbar,xcamera,zbarcam
+requirements = python3,sqlite3,kivy==2.3.1,kivymd==1.2.0,pillow,plyer,numpy,opencv,libiconv,libzbar,pyzbar,xcamera,zbarcam
 
 # (str) Supported orientation (one of landscape, sensorLandscape, portrait or all)
 orientation = portrait
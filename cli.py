@@ -0,0 +1,130 @@
+"""
+Command-line access to the vault (no Kivy): print current codes, or stream
+them as JSON lines at window boundaries.
+
+    python cli.py                    all services
+    python cli.py github             services whose title/account contains "github"
+    python cli.py --json             one JSON object per service
+    python cli.py --watch [query]    JSON line per service at each window boundary
+    python cli.py --serve            code server on a Unix socket (authcore.codeserver)
+
+Reads the same vault as the app (AUTHENTICATOR_DATA_DIR / --data-dir, see
+authcore.storage) and uses the app's cached NTP offset when there is one.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from authcore.clocksync import ClockSync
+from authcore.storage import VAULT_BACKEND, get_data_file, set_data_dir
+from authcore.totp import BOUNDARY_SLACK, TOTPEngine, format_code
+from authcore.vault import open_vault
+
+
+def _matches(service, query):
+    if not query:
+        return True
+    query = query.lower()
+    return query in service.get("title", "").lower() or query in service.get("account", "").lower()
+
+
+def load(query=None, backend=VAULT_BACKEND):
+    """Services matching `query` (substring of title or account, case-insensitive)."""
+    vault = open_vault(get_data_file(), backend, read_only=True)
+    try:
+        return [dict(s) for s in vault.services if _matches(s, query)]
+    finally:
+        vault.close()
+
+
+def make_clock():
+    """Corrected clock with the offset the app last measured (no network)."""
+    return ClockSync.corrected_clock(get_data_file())
+
+
+def _record(service, engine, now):
+    window = engine.code_window(service["id"], now)
+    code, expires = window[0] if window is not None else (None, None)
+    return {
+        "id": service["id"],
+        "title": service.get("title", ""),
+        "account": service.get("account", ""),
+        "code": code,
+        "period": engine.period(service["id"]),
+        "expires": expires,
+    }
+
+
+def print_codes(services, engine, clock, as_json=False, out=sys.stdout):
+    now = clock()
+    if as_json:
+        for s in services:
+            out.write(json.dumps(_record(s, engine, now), ensure_ascii=False) + "\n")
+        return
+    codes = engine.codes(now)
+    width = max((len(s.get("title", "")) for s in services), default=0)
+    for s in services:
+        code = codes.get(s["id"])
+        remaining = int(engine.remaining(now, engine.period(s["id"])))
+        shown = format_code(code) if code else "ERR KEY"
+        out.write(f"{s.get('title', ''):<{width}}  {shown:>9}  {remaining:>2}s  {s.get('account', '')}\n")
+
+
+def watch(services, engine, clock, out=sys.stdout):
+    """Emit every code once, then the codes of each period group when its window rolls over."""
+    by_id = {s["id"]: s for s in services}
+    now = clock()
+    rolled = engine.refresh(now) or engine.periods()
+    while True:
+        for period in rolled:
+            for sid in engine.period_codes(period, now):
+                out.write(json.dumps(_record(by_id[sid], engine, now), ensure_ascii=False) + "\n")
+        out.flush()
+        delay = min(engine.remaining(clock(), p) for p in engine.periods())
+        time.sleep(delay + BOUNDARY_SLACK)
+        now = clock()
+        rolled = engine.refresh(now)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print TOTP codes from the Authenticator vault.")
+    parser.add_argument("query", nargs="?", help="substring of title or account (case-insensitive)")
+    parser.add_argument("--json", action="store_true", help="one JSON object per line")
+    parser.add_argument("--watch", action="store_true", help="stream JSON lines at window boundaries")
+    parser.add_argument("--serve", action="store_true", help="serve codes on a Unix socket until interrupted")
+    parser.add_argument("--socket", help="socket path for --serve (default: codes.sock in the data dir)")
+    parser.add_argument("--data-dir", help="directory with services.json (default: the app's data dir)")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default=VAULT_BACKEND,
+                        help="vault backend (default: auto)")
+    args = parser.parse_args(argv)
+
+    if args.data_dir:
+        set_data_dir(args.data_dir)
+    if args.serve:
+        from authcore.codeserver import CodeServer
+        socket_path = args.socket or get_data_file().with_name("codes.sock")
+        CodeServer(get_data_file(), socket_path, args.backend).run()
+        return 0
+    services = load(args.query, args.backend)
+    if not services:
+        print("No matching services." if args.query else f"No services in {get_data_file()}", file=sys.stderr)
+        return 1
+
+    clock = make_clock()
+    engine = TOTPEngine(clock=clock)
+    # One batch per period group for the whole vault
+    engine.set_services((s["id"], s) for s in services)
+    try:
+        if args.watch:
+            watch(services, engine, clock)
+        else:
+            print_codes(services, engine, clock, as_json=args.json)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())